@@ -1,13 +1,25 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import FileResponse
+import os
 from datetime import datetime
+from typing import Annotated
 
-from ..models.investment_models import InvestmentParams, AnalysisResult
-from ..services.async_investment_analysis_service import AsyncInvestmentAnalysisService
+from ..models.investment_models import (
+    InvestmentParams, AnalysisResult, RollingWindowParams, RollingWindowResult, RobustnessParams, RobustnessResult
+)
+from ..services.async_investment_analysis_service import AsyncInvestmentAnalysisService, ANALYSIS_CACHE_VERSION
 from ..repositories.async_binance_repository import AsyncBinanceRepository
+from ..utils.http_cache import make_etag, etag_matches, not_modified_response, cached_json_response
+from ..utils.profiling import PROFILING_ENABLED, get_profile_path, stage_timer
+from ..utils.admission import get_admission_controller, get_client_id
 
 root_router = APIRouter(tags=["root"])
 api_router = APIRouter(prefix="/api", tags=["investment"])
 
+FINAL_ANALYSIS_CACHE_CONTROL = "public, max-age=86400"
+LIVE_ANALYSIS_CACHE_CONTROL = "no-cache"
+SYMBOLS_CACHE_CONTROL = "public, max-age=60"
+
 
 def get_investment_service():
     return AsyncInvestmentAnalysisService()
@@ -30,11 +42,8 @@ async def health_check():
     }
 
 
-@api_router.post("/analyze", response_model=AnalysisResult)
-async def analyze_investments(
-    params: InvestmentParams,
-    service: AsyncInvestmentAnalysisService = Depends(get_investment_service)
-):
+async def _analyze(request: Request, params: InvestmentParams,
+                   service: AsyncInvestmentAnalysisService, analyze):
     try:
         from ..utils.date_utils import convert_date_to_timestamp
         
@@ -43,18 +52,85 @@ async def analyze_investments(
         
         params.set_timestamps(start_timestamp, end_timestamp)
         
-        result = await service.analyze_investment_strategy(params)
-        return result
+        if service.is_period_final(params):
+            cache_control = FINAL_ANALYSIS_CACHE_CONTROL
+            etag = make_etag(ANALYSIS_CACHE_VERSION, params.model_dump())
+            if etag_matches(request, etag):
+                return not_modified_response(etag, cache_control)
+        else:
+            cache_control = LIVE_ANALYSIS_CACHE_CONTROL
+            etag = None
+        
+        # Cache hits cost nothing, so they skip admission and its throughput figures
+        result = await service.get_cached_result(params)
+        if result is None:
+            client_id = get_client_id(request.headers.get("x-forwarded-for"), request.client.host if request.client else None)
+            async with get_admission_controller().admit(client_id, service.estimate_work(params)):
+                result = await analyze(params)
+        
+        if not service.history_complete:
+            # Some chunks failed to download: the result may change on retry
+            cache_control = LIVE_ANALYSIS_CACHE_CONTROL
+            etag = None
         
+        with stage_timer("serialize"):
+            return cached_json_response(request, result.model_dump(mode="json"), cache_control, etag)
+        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@api_router.post("/analyze", response_model=AnalysisResult)
+async def analyze_investments(
+    request: Request,
+    params: InvestmentParams,
+    service: AsyncInvestmentAnalysisService = Depends(get_investment_service)
+):
+    return await _analyze(request, params, service, service.analyze_investment_strategy)
+
+
+@api_router.get("/analyze", response_model=AnalysisResult)
+async def analyze_investments_get(
+    request: Request,
+    params: Annotated[InvestmentParams, Query()],
+    service: AsyncInvestmentAnalysisService = Depends(get_investment_service)
+):
+    return await _analyze(request, params, service, service.analyze_investment_strategy)
+
+
+@api_router.post("/analyze/rolling", response_model=RollingWindowResult)
+async def analyze_rolling_windows(
+    request: Request,
+    params: RollingWindowParams,
+    service: AsyncInvestmentAnalysisService = Depends(get_investment_service)
+):
+    return await _analyze(request, params, service, service.analyze_rolling_windows)
+
+
+@api_router.post("/analyze/robustness", response_model=RobustnessResult)
+async def analyze_robustness(
+    request: Request,
+    params: RobustnessParams,
+    service: AsyncInvestmentAnalysisService = Depends(get_investment_service)
+):
+    return await _analyze(request, params, service, service.analyze_robustness)
+
+
 @api_router.get("/symbols")
-async def get_available_symbols():
+async def get_available_symbols(request: Request):
     try:
         async with AsyncBinanceRepository() as binance_repo:
             symbols = await binance_repo.get_available_symbols()
-            return {"symbols": symbols}
+            return cached_json_response(request, {"symbols": symbols}, SYMBOLS_CACHE_CONTROL)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@api_router.get("/profiles/{profile_id}")
+async def download_profile(profile_id: str):
+    profile_path = get_profile_path(profile_id) if PROFILING_ENABLED else None
+    if not profile_path or not os.path.exists(profile_path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(profile_path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
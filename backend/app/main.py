@@ -1,8 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 import os
 
 from app.api.investment_routes import root_router, api_router
+from app.utils.profiling import ServerTimingMiddleware
 
 app = FastAPI(
     title="Investment Analysis API", 
@@ -16,8 +18,12 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile-Id"],
 )
 
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+app.add_middleware(ServerTimingMiddleware)
+
 app.include_router(root_router)
 app.include_router(api_router)
 
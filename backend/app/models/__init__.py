@@ -1,3 +1,9 @@
-from .investment_models import InvestmentParams, TradeRecord, AnalysisResult
+from .investment_models import (
+    InvestmentParams, TradeRecord, AnalysisResult, RollingWindowParams, RollingWindowResult,
+    RobustnessParams, RobustnessResult
+)
 
-__all__ = ['InvestmentParams', 'TradeRecord', 'AnalysisResult']
+__all__ = [
+    'InvestmentParams', 'TradeRecord', 'AnalysisResult', 'RollingWindowParams', 'RollingWindowResult',
+    'RobustnessParams', 'RobustnessResult',
+]
@@ -1,17 +1,22 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Optional, Literal
 from datetime import datetime
 
 
 class InvestmentParams(BaseModel):
-    initial_balance: float = 10000
-    trade_amount: float = 1000
-    threshold_percent: float = 0.05
+    initial_balance: float = Field(10000.0, gt=0)
+    # A zero trade amount or threshold would let the ohlc buy loop refill forever
+    trade_amount: float = Field(1000.0, gt=0)
+    threshold_percent: float = Field(0.05, gt=0, lt=1)
     commission_rate: float = 0.00075
     start_date: str
     end_date: str
     symbol: str = "ETHUSDT"
     interval: str = "1h"
+    # "close" fills only on candle closes; "ohlc" lets limit levels fill
+    # inside the candle on its low (buys) and high (take-profits).
+    fill_mode: Literal["close", "ohlc"] = "close"
+    chart_points: int = Field(500, ge=10, le=5000)
     
     start_timestamp: Optional[int] = None
     end_timestamp: Optional[int] = None
@@ -21,6 +26,17 @@ class InvestmentParams(BaseModel):
         self.end_timestamp = end_timestamp
 
 
+class RollingWindowParams(InvestmentParams):
+    window_days: int = Field(30, ge=1)
+    step_days: int = Field(1, ge=1)
+
+
+class RobustnessParams(InvestmentParams):
+    paths: int = Field(1000, ge=10, le=20000)
+    block_size: int = Field(24, ge=1)
+    seed: int = Field(0, ge=0)
+
+
 class TradeRecord(BaseModel):
     order_id: str
     order_type: str
@@ -41,3 +57,13 @@ class AnalysisResult(BaseModel):
     trades: List[TradeRecord]
     summary: dict
     chart_data: dict
+
+
+class RollingWindowResult(BaseModel):
+    windows: dict
+    summary: dict
+
+
+class RobustnessResult(BaseModel):
+    distributions: dict
+    summary: dict
@@ -1,4 +1,27 @@
-from .binance_repository import BinanceRepository
-from .async_binance_repository import AsyncBinanceRepository
+import importlib
 
-__all__ = ['BinanceRepository', 'AsyncBinanceRepository']
+# The API only uses the async stack; the sync one (requests/urllib3) is
+# imported on first attribute access instead of at startup.
+_LAZY_IMPORTS = {
+    'BinanceRepository': '.binance_repository',
+    'AsyncBinanceRepository': '.async_binance_repository',
+    'CacheBackend': '.cache_repository',
+    'MemoryCache': '.cache_repository',
+    'DiskCache': '.cache_repository',
+    'RedisCache': '.cache_repository',
+    'get_cache': '.cache_repository',
+}
+
+__all__ = [
+    'BinanceRepository', 'AsyncBinanceRepository',
+    'CacheBackend', 'MemoryCache', 'DiskCache', 'RedisCache', 'get_cache',
+]
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,15 +1,27 @@
 import aiohttp
 import asyncio
-from typing import List, Dict, Any
+import json
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 
+from ..utils.date_utils import get_interval_ms
+from ..utils.profiling import stage_timer
+from .cache_repository import CacheBackend, get_cache, encode_klines, decode_klines
+
+# Binance returns at most this many klines per request
+CHUNK_SIZE = 1000
+
 
 class AsyncBinanceRepository:
     
-    def __init__(self):
+    def __init__(self, cache: Optional[CacheBackend] = None):
         self.base_url = "https://api.binance.com/api/v3"
         self.session = None
         self.semaphore = asyncio.Semaphore(10)
+        self.cache = cache if cache is not None else get_cache()
+        # Chunks that failed to download since the session opened; a series
+        # with gaps must not be cached or served as final
+        self.failed_chunks = 0
     
     async def __aenter__(self):
         self.session = aiohttp.ClientSession()
@@ -20,71 +32,128 @@ class AsyncBinanceRepository:
             await self.session.close()
     
     async def get_price_data_chunk(self, start_time: int, limit: int, symbol: str, interval: str) -> List[Dict[str, Any]]:
-        async with self.semaphore:
-            url = f"{self.base_url}/klines?symbol={symbol}&interval={interval}&startTime={start_time}&limit={limit}"
-            
-            try:
-                async with self.session.get(url) as response:
-                    if response.status == 200:
-                        response_data = await response.json()
-                        
-                        data = []
-                        for kline in response_data:
-                            price_data = {
-                                "timestamp": kline[0],           
-                                "open": float(kline[1]),         
-                                "high": float(kline[2]),         
-                                "low": float(kline[3]),          
-                                "close": float(kline[4]),        
-                                "volume": float(kline[5]),       
-                                "close_time": kline[6]           
-                            }
-                            data.append(price_data)
-                        
-                        return data
-                    else:
-                        return []
-            except Exception as e:
-                return []
+        with stage_timer("fetch"):
+            cached = await self.cache.get(self._get_chunk_key(start_time, limit, symbol, interval))
+            from_cache, payload = await self._fetch_chunk(start_time, limit, symbol, interval, cached)
+        
+        with stage_timer("parse"):
+            data = self._parse_chunk(from_cache, payload)
+        
+        if not from_cache and self._is_chunk_final(data, limit):
+            with stage_timer("fetch"):
+                await self.cache.set(self._get_chunk_key(start_time, limit, symbol, interval), encode_klines(data))
+        
+        return data
     
     async def get_historical_price_data_parallel(self, start_time: int, end_time: int, symbol: str, interval: str) -> List[Dict[str, Any]]:
-        chunk_size = 1000
+        """Candles opening in [start_time, end_time), fetched in parallel chunks."""
+        chunk_size = CHUNK_SIZE
         interval_ms = self._get_interval_ms(interval)
+        chunk_span = chunk_size * interval_ms
         
         total_duration = end_time - start_time
         total_candles = total_duration // interval_ms
         
-        if total_candles <= chunk_size:
-            return await self.get_price_data_chunk(start_time, chunk_size, symbol, interval)
-        
+        # Chunks start on a fixed grid rather than at start_time, so requests
+        # over overlapping periods reuse the same cached chunks
         chunks = []
-        current_start = start_time
+        current_start = start_time - start_time % chunk_span
         
         while current_start < end_time:
-            chunk_end = min(current_start + (chunk_size * interval_ms), end_time)
-            chunks.append((current_start, chunk_end))
-            current_start = chunk_end
+            chunks.append((current_start, current_start + chunk_span))
+            current_start += chunk_span
         
         print(f"Fetching {len(chunks)} chunks for {symbol} from {start_time} to {end_time}")
         print(f"Total duration: {total_duration}ms, interval: {interval_ms}ms, total candles: {total_candles}")
         
-        tasks = []
-        for chunk_start, chunk_end in chunks:
-            task = self.get_price_data_chunk(chunk_start, chunk_size, symbol, interval)
-            tasks.append(task)
+        keys = [self._get_chunk_key(chunk_start, chunk_size, symbol, interval) for chunk_start, _ in chunks]
         
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # All chunks are downloaded before any is parsed, so the fetch stage
+        # is the wall time spent waiting on the network and the cache
+        with stage_timer("fetch"):
+            # One batched cache lookup, then downloads for the missing chunks
+            cached_chunks = await self.cache.get_many(keys)
+            tasks = []
+            for (chunk_start, chunk_end), cached in zip(chunks, cached_chunks):
+                task = self._fetch_chunk(chunk_start, chunk_size, symbol, interval, cached)
+                tasks.append(task)
+            results = await asyncio.gather(*tasks, return_exceptions=True)
         
         all_data = []
-        for i, result in enumerate(results):
-            if isinstance(result, list):
-                all_data.extend(result)
-                print(f"Chunk {i+1}: got {len(result)} candles")
-            else:
-                print(f"Chunk {i+1}: error - {result}")
+        new_chunks = []
+        with stage_timer("parse"):
+            for i, result in enumerate(results):
+                if isinstance(result, BaseException):
+                    print(f"Chunk {i+1}: error - {result}")
+                    self.failed_chunks += 1
+                    continue
+                
+                chunk_start, chunk_end = chunks[i]
+                from_cache, payload = result
+                data = self._parse_chunk(from_cache, payload)
+                if not from_cache and self._is_chunk_final(data, chunk_size):
+                    new_chunks.append((keys[i], data))
+                
+                # Keep each chunk to its own slot of the grid, within the period
+                lower = max(chunk_start, start_time)
+                upper = min(chunk_end, end_time)
+                all_data.extend(row for row in data if lower <= row["timestamp"] < upper)
+                print(f"Chunk {i+1}: got {len(data)} candles")
+            
+            all_data.sort(key=lambda x: x["timestamp"])
+        
+        if new_chunks:
+            with stage_timer("fetch"):
+                await self.cache.set_many({key: encode_klines(data) for key, data in new_chunks})
         
         print(f"Total data collected: {len(all_data)} candles")
-        return sorted(all_data, key=lambda x: x["timestamp"])
+        return all_data
+    
+    async def _fetch_chunk(self, start_time: int, limit: int, symbol: str, interval: str,
+                           cached: Optional[bytes] = None) -> tuple:
+        """Raw klines of one chunk as (from_cache, payload), downloading it
+        unless ``cached`` holds it; payload is None when the download failed."""
+        if cached is not None:
+            return True, cached
+        
+        async with self.semaphore:
+            url = f"{self.base_url}/klines?symbol={symbol}&interval={interval}&startTime={start_time}&limit={limit}"
+            
+            try:
+                async with self.session.get(url) as response:
+                    if response.status == 200:
+                        return False, await response.read()
+                    else:
+                        print(f"Chunk at {start_time} failed with status {response.status}")
+                        self.failed_chunks += 1
+                        return False, None
+            except Exception as e:
+                print(f"Chunk at {start_time} failed: {e}")
+                self.failed_chunks += 1
+                return False, None
+    
+    def _parse_chunk(self, from_cache: bool, payload: Optional[bytes]) -> List[Dict[str, Any]]:
+        if payload is None:
+            return []
+        if from_cache:
+            return decode_klines(payload)
+        
+        data = []
+        for kline in json.loads(payload):
+            price_data = {
+                "timestamp": kline[0],           
+                "open": float(kline[1]),         
+                "high": float(kline[2]),         
+                "low": float(kline[3]),          
+                "close": float(kline[4]),        
+                "volume": float(kline[5]),       
+                "close_time": kline[6]           
+            }
+            data.append(price_data)
+        return data
+    
+    def _get_chunk_key(self, start_time: int, limit: int, symbol: str, interval: str) -> str:
+        return f"klines:{symbol}:{interval}:{start_time}:{limit}"
     
     async def get_symbol_24h_data(self, symbol: str) -> Dict[str, Any]:
         """Get 24h data for a specific symbol using the same API as analyze"""
@@ -171,13 +240,13 @@ class AsyncBinanceRepository:
             print(f"Error fetching available symbols: {e}")
             return []
     
+    def is_complete(self) -> bool:
+        return self.failed_chunks == 0
+    
+    def _is_chunk_final(self, data: List[Dict[str, Any]], limit: int) -> bool:
+        # Only full chunks of closed candles can never change
+        now = int(datetime.now().timestamp() * 1000)
+        return len(data) == limit and data[-1]["close_time"] < now
+    
     def _get_interval_ms(self, interval: str) -> int:
-        interval_map = {
-            "1m": 60 * 1000,
-            "5m": 5 * 60 * 1000,
-            "15m": 15 * 60 * 1000,
-            "1h": 60 * 60 * 1000,
-            "4h": 4 * 60 * 60 * 1000,
-            "1d": 24 * 60 * 60 * 1000
-        }
-        return interval_map.get(interval, 60 * 1000)
+        return get_interval_ms(interval)
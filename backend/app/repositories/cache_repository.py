@@ -0,0 +1,380 @@
+import asyncio
+import hashlib
+import os
+import struct
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+from urllib.parse import urlparse
+
+
+# One candle: timestamp, open, high, low, close, volume, close_time
+KLINE_STRUCT = struct.Struct("<q5dq")
+
+
+def encode_klines(klines: List[Dict[str, Any]]) -> bytes:
+    return b"".join(
+        KLINE_STRUCT.pack(
+            kline["timestamp"], kline["open"], kline["high"], kline["low"],
+            kline["close"], kline["volume"], kline["close_time"]
+        )
+        for kline in klines
+    )
+
+
+def decode_klines(payload: bytes) -> List[Dict[str, Any]]:
+    return [
+        {
+            "timestamp": timestamp,
+            "open": open_price,
+            "high": high,
+            "low": low,
+            "close": close,
+            "volume": volume,
+            "close_time": close_time
+        }
+        for timestamp, open_price, high, low, close, volume, close_time in KLINE_STRUCT.iter_unpack(payload)
+    ]
+
+
+class CacheBackend(ABC):
+    """Byte-oriented key/value store shared by the repository and services.
+
+    Backends never raise on lookups or writes: a broken cache behaves like
+    an empty one so requests still fall through to Binance.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        ...
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        return list(await asyncio.gather(*[self.get(key) for key in keys]))
+
+    async def set_many(self, items: Dict[str, bytes], ttl: Optional[float] = None) -> None:
+        await asyncio.gather(*[self.set(key, value, ttl) for key, value in items.items()])
+
+
+class NullCache(CacheBackend):
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        return None
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU bounded by the total size of the stored values."""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.entries = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            self._remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        if len(value) > self.max_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (value, time.time() + ttl if ttl else None)
+        self.total_bytes += len(value)
+        while self.total_bytes > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+
+    def _remove(self, key: str) -> None:
+        value, _ = self.entries.pop(key)
+        self.total_bytes -= len(value)
+
+
+class DiskCache(CacheBackend):
+    """One file per key under ``cache_dir``, shared by every worker on the host.
+
+    Reads refresh a file's mtime; once the directory grows past ``max_bytes``
+    the least recently used files are evicted.
+    """
+
+    EXPIRY_STRUCT = struct.Struct("<d")
+    TEMP_PREFIX = "tmp-"
+
+    def __init__(self, cache_dir: str, max_bytes: int = 1024 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # Estimated size of the directory, recounted on every prune
+        self.total_bytes = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            return await asyncio.to_thread(self._read, self._get_path(key))
+        except Exception as e:
+            print(f"Disk cache read failed for {key}: {e}")
+            return None
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + ttl if ttl else 0.0
+        try:
+            await asyncio.to_thread(self._write, self._get_path(key), self.EXPIRY_STRUCT.pack(expires_at) + value)
+        except Exception as e:
+            print(f"Disk cache write failed for {key}: {e}")
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode()).hexdigest())
+
+    def _read(self, path: str) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as cache_file:
+                payload = cache_file.read()
+        except FileNotFoundError:
+            return None
+        (expires_at,) = self.EXPIRY_STRUCT.unpack_from(payload)
+        if expires_at and expires_at <= time.time():
+            self._remove(path)
+            return None
+        os.utime(path)
+        return payload[self.EXPIRY_STRUCT.size:]
+
+    def _write(self, path: str, payload: bytes) -> None:
+        # Write then rename so concurrent readers never see a partial file
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=self.TEMP_PREFIX)
+        with os.fdopen(fd, "wb") as cache_file:
+            cache_file.write(payload)
+        os.replace(temp_path, path)
+
+        if self.total_bytes is None or self.total_bytes + len(payload) > self.max_bytes:
+            self._prune()
+        else:
+            self.total_bytes += len(payload)
+
+    def _prune(self) -> None:
+        entries = []
+        with os.scandir(self.cache_dir) as scan:
+            for entry in scan:
+                if entry.name.startswith(self.TEMP_PREFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        # Evict down to 90% of the cap so the next writes do not each rescan
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes * 0.9:
+                break
+            self._remove(path)
+            total_bytes -= size
+        self.total_bytes = total_bytes
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class RedisUnavailable(ConnectionError):
+    pass
+
+
+class RedisCache(CacheBackend):
+    """Minimal RESP client (GET / MGET / SET PX) for Redis or any server speaking its protocol.
+
+    Commands share one connection. After a timeout or connection error the
+    backend is treated as down for ``retry_after`` seconds, during which every
+    call misses at once instead of waiting on the server again.
+    """
+
+    # Keys per MGET, so one reply stays a few MB of klines
+    MGET_BATCH = 100
+
+    def __init__(self, url: str, timeout: float = 1.0, retry_after: float = 30.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.down_until = 0.0
+        self.reader = None
+        self.writer = None
+        self.lock = asyncio.Lock()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            return await self._execute([b"GET", key.encode()])
+        except RedisUnavailable:
+            return None
+        except Exception as e:
+            print(f"Redis cache read failed for {key}: {e}")
+            return None
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        values = []
+        for offset in range(0, len(keys), self.MGET_BATCH):
+            batch = keys[offset:offset + self.MGET_BATCH]
+            try:
+                values += await self._execute([b"MGET", *[key.encode() for key in batch]])
+            except RedisUnavailable:
+                values += [None] * len(batch)
+            except Exception as e:
+                print(f"Redis cache read failed for {len(batch)} keys: {e}")
+                values += [None] * len(batch)
+        return values
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        await self.set_many({key: value}, ttl)
+
+    async def set_many(self, items: Dict[str, bytes], ttl: Optional[float] = None) -> None:
+        commands = []
+        for key, value in items.items():
+            command = [b"SET", key.encode(), value]
+            if ttl:
+                command += [b"PX", str(int(ttl * 1000)).encode()]
+            commands.append(command)
+        try:
+            # Pipelined: all commands are sent before the replies are read
+            await self._execute(*commands)
+        except RedisUnavailable:
+            pass
+        except Exception as e:
+            print(f"Redis cache write failed for {len(commands)} keys: {e}")
+
+    async def _execute(self, *commands: List[bytes]):
+        # Checked again under the lock, for callers queued behind a failure
+        if time.monotonic() < self.down_until:
+            raise RedisUnavailable("Redis is marked down")
+        async with self.lock:
+            if time.monotonic() < self.down_until:
+                raise RedisUnavailable("Redis is marked down")
+            try:
+                try:
+                    reused = self.writer is not None
+                    if not reused:
+                        await self._connect()
+                    replies = await self._send(*commands)
+                except ConnectionError:
+                    if not reused:
+                        raise
+                    # The server may have closed an idle connection; retry once
+                    await self._disconnect()
+                    await self._connect()
+                    replies = await self._send(*commands)
+                return replies[0] if len(replies) == 1 else replies
+            except (asyncio.TimeoutError, OSError) as e:
+                await self._disconnect()
+                self.down_until = time.monotonic() + self.retry_after
+                print(f"Redis unavailable, skipping it for {self.retry_after}s: {e!r}")
+                raise RedisUnavailable("Redis is marked down") from e
+            except BaseException:
+                # A cancelled command leaves its reply unread on the socket,
+                # where the next command would pick it up
+                await self._disconnect()
+                raise
+
+    async def _connect(self) -> None:
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        if self.password:
+            await self._send([b"AUTH", self.password.encode()])
+        if self.db:
+            await self._send([b"SELECT", str(self.db).encode()])
+
+    async def _disconnect(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = None
+        self.writer = None
+
+    async def _send(self, *commands: List[bytes]) -> list:
+        request = []
+        for command in commands:
+            request.append(b"*%d\r\n" % len(command))
+            for part in command:
+                request.append(b"$%d\r\n%s\r\n" % (len(part), part))
+        self.writer.write(b"".join(request))
+        await asyncio.wait_for(self.writer.drain(), self.timeout)
+        return await asyncio.wait_for(self._read_replies(len(commands)), self.timeout)
+
+    async def _read_replies(self, count: int) -> list:
+        # Read every reply before raising, so none is left on the connection
+        replies, error = [], None
+        for _ in range(count):
+            try:
+                replies.append(await self._read_reply())
+            except RuntimeError as e:
+                replies.append(None)
+                error = error or e
+        if error is not None:
+            raise error
+        return replies
+
+    async def _read_reply(self):
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body
+        if kind == b"-":
+            raise RuntimeError(body.decode())
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            return (await self.reader.readexactly(length + 2))[:-2]
+        if kind == b"*":
+            length = int(body)
+            if length < 0:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise ConnectionError(f"Unexpected Redis reply: {line!r}")
+
+
+_cache = None
+
+
+def get_cache() -> CacheBackend:
+    """Process-wide cache, created on first use from CACHE_BACKEND
+    (memory, disk, redis or none)."""
+    global _cache
+    if _cache is None:
+        backend = os.environ.get("CACHE_BACKEND", "memory").lower()
+        if backend == "disk":
+            _cache = DiskCache(
+                os.environ.get("CACHE_DIR", os.path.join(tempfile.gettempdir(), "binance_cache")),
+                int(os.environ.get("CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+            )
+        elif backend == "redis":
+            _cache = RedisCache(
+                os.environ.get("REDIS_URL", "redis://localhost:6379/0"),
+                float(os.environ.get("REDIS_TIMEOUT", 1.0)),
+                float(os.environ.get("REDIS_RETRY_AFTER", 30.0))
+            )
+        elif backend == "none":
+            _cache = NullCache()
+        else:
+            _cache = MemoryCache(int(os.environ.get("CACHE_MAX_BYTES", 256 * 1024 * 1024)))
+    return _cache
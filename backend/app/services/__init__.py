@@ -1,4 +1,18 @@
-from .investment_analysis_service import InvestmentAnalysisService
-from .async_investment_analysis_service import AsyncInvestmentAnalysisService
+import importlib
+
+# Imported on first attribute access so the unused sync stack stays unloaded
+_LAZY_IMPORTS = {
+    'InvestmentAnalysisService': '.investment_analysis_service',
+    'AsyncInvestmentAnalysisService': '.async_investment_analysis_service',
+}
 
 __all__ = ['InvestmentAnalysisService', 'AsyncInvestmentAnalysisService']
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,21 +1,127 @@
+import asyncio
+import statistics
+import zlib
+from bisect import bisect_left
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from fastapi import HTTPException
 
-from ..models.investment_models import InvestmentParams, TradeRecord, AnalysisResult
+from ..models.investment_models import (
+    InvestmentParams, TradeRecord, AnalysisResult, RollingWindowParams, RollingWindowResult,
+    RobustnessParams, RobustnessResult
+)
 from ..repositories.async_binance_repository import AsyncBinanceRepository
+from ..repositories.cache_repository import CacheBackend, get_cache
+from ..utils.date_utils import get_interval_ms
+from ..utils.http_cache import make_digest
+from ..utils.price_index import PriceIndex
+from ..utils.profiling import stage_timer, profiled
+from .strategy_engine import simulate_history_windows
+from .fill_rules import (
+    BUY, TRAIL, get_bar_prices, get_bar_phases, get_trailed_level, get_buy_fill_price, get_sell_fill_price
+)
+
+
+# Bump whenever the strategy engine changes results for the same parameters
+ANALYSIS_CACHE_VERSION = "4"
+
+# Cached results expire so entries of old versions and rare queries age out
+ANALYSIS_CACHE_TTL = 7 * 24 * 60 * 60
+
+# A candle of one bootstrapped path, evaluated in a vectorised batch, costs
+# roughly this fraction of a candle replayed by the scalar engine
+BATCH_CANDLE_DISCOUNT = 20
+
+ROBUSTNESS_METRICS = ["roi_percent", "min_balance", "pending_positions", "pending_exposure", "total_trades"]
 
 
 class AsyncInvestmentAnalysisService:
     
-    def __init__(self):
+    def __init__(self, cache: Optional[CacheBackend] = None):
         self.binance_repository = None
+        self.cache = cache if cache is not None else get_cache()
+        # False once a fetch came back with missing chunks
+        self.history_complete = True
+    
+    def is_period_final(self, params: InvestmentParams) -> bool:
+        # The history holds candles opening before end_timestamp; once the last
+        # of them has closed the result is fixed for these parameters.
+        last_close = params.end_timestamp + get_interval_ms(params.interval)
+        return last_close <= int(datetime.now().timestamp() * 1000)
+    
+    def estimate_work(self, params: InvestmentParams) -> int:
+        """Candles the request will fetch and replay, known before fetching."""
+        interval_ms = get_interval_ms(params.interval)
+        candles = max(1, (params.end_timestamp - params.start_timestamp) // interval_ms)
+        
+        if isinstance(params, RollingWindowParams):
+            day_ms = 24 * 60 * 60 * 1000
+            period_days = (params.end_timestamp - params.start_timestamp) // day_ms
+            window_count = max(0, (period_days - params.window_days) // params.step_days + 1)
+            candles += window_count * (params.window_days * day_ms // interval_ms)
+        elif isinstance(params, RobustnessParams):
+            candles += candles * params.paths // BATCH_CANDLE_DISCOUNT
+        
+        return candles
     
     async def analyze_investment_strategy(self, params: InvestmentParams) -> AnalysisResult:
         print(f"Starting analysis for {params.symbol} from {params.start_date} to {params.end_date}")
         print(f"Timestamps: {params.start_timestamp} to {params.end_timestamp}")
         
-        async with AsyncBinanceRepository() as binance_repo:
+        return await self._get_or_compute("analysis", params, AnalysisResult, self._run_analysis)
+    
+    async def analyze_rolling_windows(self, params: RollingWindowParams) -> RollingWindowResult:
+        print(f"Starting rolling {params.window_days}d window analysis for {params.symbol} "
+              f"from {params.start_date} to {params.end_date}, step {params.step_days}d")
+        
+        return await self._get_or_compute("rolling", params, RollingWindowResult, self._run_rolling_windows)
+    
+    async def analyze_robustness(self, params: RobustnessParams) -> RobustnessResult:
+        print(f"Starting robustness analysis for {params.symbol} over {params.paths} bootstrapped paths "
+              f"(block size {params.block_size}, seed {params.seed})")
+        
+        return await self._get_or_compute("robustness", params, RobustnessResult, self._run_robustness)
+    
+    async def get_cached_result(self, params: InvestmentParams):
+        """The cached result for a closed period, or None. Looked up before
+        admission so that repeated requests are not charged as new work."""
+        if not self.is_period_final(params):
+            return None
+        kind, result_model = self._get_result_kind(params)
+        return await self._load_cached(self._get_cache_key(kind, params), result_model)
+    
+    async def _get_or_compute(self, kind: str, params: InvestmentParams, result_model, compute):
+        cache_key = None
+        if self.is_period_final(params):
+            cache_key = self._get_cache_key(kind, params)
+            cached = await self._load_cached(cache_key, result_model)
+            if cached is not None:
+                return cached
+        
+        result = await compute(params)
+        if cache_key and self.history_complete:
+            await self.cache.set(cache_key, zlib.compress(result.model_dump_json().encode()), ANALYSIS_CACHE_TTL)
+        return result
+    
+    def _get_result_kind(self, params: InvestmentParams) -> tuple:
+        if isinstance(params, RollingWindowParams):
+            return "rolling", RollingWindowResult
+        if isinstance(params, RobustnessParams):
+            return "robustness", RobustnessResult
+        return "analysis", AnalysisResult
+    
+    def _get_cache_key(self, kind: str, params: InvestmentParams) -> str:
+        return f"{kind}:{make_digest(ANALYSIS_CACHE_VERSION, params.model_dump())}"
+    
+    async def _load_cached(self, cache_key: str, result_model):
+        cached = await self.cache.get(cache_key)
+        if cached is None:
+            return None
+        print(f"Serving cached {cache_key}")
+        return result_model.model_validate_json(zlib.decompress(cached))
+    
+    async def _fetch_history(self, params: InvestmentParams) -> List[Dict[str, Any]]:
+        async with AsyncBinanceRepository(self.cache) as binance_repo:
             self.binance_repository = binance_repo
             
             history_list = await self.binance_repository.get_historical_price_data_parallel(
@@ -27,19 +133,155 @@ class AsyncInvestmentAnalysisService:
             
             print(f"Received {len(history_list)} price records")
             
+            if not binance_repo.is_complete():
+                print(f"History incomplete: {binance_repo.failed_chunks} chunks failed, result will not be cached")
+                self.history_complete = False
+            
             if not history_list:
                 raise HTTPException(
                     status_code=400, 
                     detail="No data available for the specified period"
                 )
             
+            return history_list
+    
+    async def _run_analysis(self, params: InvestmentParams) -> AnalysisResult:
+        history_list = await self._fetch_history(params)
+        
+        with stage_timer("engine"):
             trades, summary, chart_data = await self._execute_strategy_analysis(params, history_list)
-            
-            return AnalysisResult(
-                trades=trades,
-                summary=summary,
-                chart_data=chart_data
+        
+        return AnalysisResult(
+            trades=trades,
+            summary=summary,
+            chart_data=chart_data
+        )
+    
+    async def _run_rolling_windows(self, params: RollingWindowParams) -> RollingWindowResult:
+        history_list = await self._fetch_history(params)
+        
+        timestamps = [row["timestamp"] for row in history_list]
+        bounds = self._get_window_bounds(params, timestamps)
+        if not bounds:
+            raise HTTPException(
+                status_code=400,
+                detail=f"The period is shorter than one {params.window_days}-day window"
+            )
+        
+        strategy = self._get_strategy(params)
+        
+        # One fetch and one event index serve every window; the index is
+        # built in the executor with the windows, off the event loop
+        with stage_timer("engine"):
+            loop = asyncio.get_running_loop()
+            summaries = await loop.run_in_executor(
+                None, profiled(simulate_history_windows), history_list, params.fill_mode, strategy, bounds
+            )
+        
+        print(f"Simulated {len(bounds)} windows over {len(history_list)} candles")
+        return self._create_rolling_result(timestamps, bounds, summaries)
+    
+    async def _run_robustness(self, params: RobustnessParams) -> RobustnessResult:
+        # numpy and the batch engine are only loaded once robustness is requested
+        from .robustness_engine import simulate_robustness
+        
+        history_list = await self._fetch_history(params)
+        if len(history_list) < 2:
+            raise HTTPException(status_code=400, detail="At least two candles are needed to resample the period")
+        
+        strategy = self._get_strategy(params)
+        with stage_timer("engine"):
+            loop = asyncio.get_running_loop()
+            outcomes, historical = await loop.run_in_executor(
+                None, profiled(simulate_robustness), history_list, strategy, params.fill_mode,
+                params.paths, params.block_size, params.seed
             )
+        
+        print(f"Simulated {params.paths} bootstrapped paths of {len(history_list)} candles")
+        return self._create_robustness_result(params, outcomes, historical)
+    
+    def _get_strategy(self, params: InvestmentParams) -> Dict[str, float]:
+        return {
+            "initial_balance": params.initial_balance,
+            "trade_amount": params.trade_amount,
+            "threshold_percent": params.threshold_percent,
+            "commission_rate": params.commission_rate
+        }
+    
+    def _get_window_bounds(self, params: RollingWindowParams, timestamps: List[int]) -> List[tuple]:
+        day_ms = 24 * 60 * 60 * 1000
+        window_ms = params.window_days * day_ms
+        step_ms = params.step_days * day_ms
+        series_end = timestamps[-1] + get_interval_ms(params.interval)
+        
+        bounds = []
+        window_start = timestamps[0]
+        while window_start + window_ms <= series_end:
+            start = bisect_left(timestamps, window_start)
+            end = bisect_left(timestamps, window_start + window_ms)
+            if end > start:
+                bounds.append((start, end))
+            window_start += step_ms
+        return bounds
+    
+    def _create_rolling_result(self, timestamps: List[int], bounds: List[tuple],
+                               summaries: List[Dict[str, float]]) -> RollingWindowResult:
+        def format_timestamp(timestamp: int) -> str:
+            return datetime.fromtimestamp(timestamp / 1000).strftime("%Y-%m-%d %H:%M:%S")
+        
+        rois = [summary["roi_percent"] for summary in summaries]
+        windows = {
+            "start_dates": [format_timestamp(timestamps[start]) for start, _ in bounds],
+            "end_dates": [format_timestamp(timestamps[end - 1]) for _, end in bounds],
+            "roi_percent": rois,
+            "min_balance": [summary["min_balance"] for summary in summaries],
+            "total_trades": [summary["total_trades"] for summary in summaries],
+            "pending_positions": [summary["pending_positions"] for summary in summaries]
+        }
+        
+        return RollingWindowResult(
+            windows=windows,
+            summary={
+                "window_count": len(summaries),
+                "mean_roi_percent": statistics.fmean(rois),
+                "median_roi_percent": statistics.median(rois),
+                "worst_roi_percent": min(rois),
+                "best_roi_percent": max(rois),
+                "positive_window_share": sum(1 for roi in rois if roi > 0) / len(rois),
+                "lowest_min_balance": min(windows["min_balance"])
+            }
+        )
+    
+    def _create_robustness_result(self, params: RobustnessParams, outcomes: Dict[str, Any],
+                                  historical: Dict[str, float]) -> RobustnessResult:
+        import numpy as np
+        
+        distributions = {}
+        for metric in ROBUSTNESS_METRICS:
+            values = outcomes[metric]
+            p5, p25, p50, p75, p95 = np.percentile(values, [5, 25, 50, 75, 95]).tolist()
+            distributions[metric] = {
+                "mean": float(values.mean()),
+                "std": float(values.std()),
+                "min": float(values.min()),
+                "p5": p5,
+                "p25": p25,
+                "p50": p50,
+                "p75": p75,
+                "p95": p95,
+                "max": float(values.max())
+            }
+        
+        return RobustnessResult(
+            distributions=distributions,
+            summary={
+                "paths": params.paths,
+                "block_size": params.block_size,
+                "seed": params.seed,
+                "loss_probability": float((outcomes["roi_percent"] < 0).mean()),
+                "historical": historical
+            }
+        )
     
     async def _execute_strategy_analysis(self, params: InvestmentParams, history_list: List[Dict[str, Any]]) -> tuple:
         balance = params.initial_balance
@@ -47,6 +289,7 @@ class AsyncInvestmentAnalysisService:
         pending_sells = []
         order_counter = 1
         trades = []
+        trade_timestamps = []
         last_buy_price = None
         
         current_price = float(history_list[0]["close"])
@@ -62,98 +305,133 @@ class AsyncInvestmentAnalysisService:
         print(f"  First price: ${current_price}")
         print(f"  First timestamp: {datetime.fromtimestamp(history_list[0]['timestamp'] / 1000)}")
         
-        day_counter = 0
+        price_index = PriceIndex.from_history(history_list, params.fill_mode)
+        ohlc = params.fill_mode == "ohlc"
+        first_day = datetime.fromtimestamp(history_list[0]["timestamp"] / 1000).date()
         current_day = None
+        visited_candles = 0
         
-        for i, row in enumerate(history_list):
+        i = 0
+        while i is not None:
+            row = history_list[i]
+            visited_candles += 1
             price = float(row["close"])
             timestamp = row["timestamp"]
             current_date = datetime.fromtimestamp(timestamp / 1000)
+            bar_open, bar_low, bar_high = get_bar_prices(
+                ohlc, float(row["open"]), float(row["low"]), float(row["high"]), price
+            )
             
             if current_day != current_date.date():
                 current_day = current_date.date()
-                day_counter += 1
+                day_counter = (current_day - first_day).days + 1
                 if day_counter % 5 == 0:  # Log every 5 days
                     print(f"  Day {day_counter}: {current_date.strftime('%Y-%m-%d')} - Price: ${price:.2f}, Balance: ${balance:.2f}, ETH: {eth_balance:.6f}")
 
             if balance < min_balance:
                 min_balance = balance
 
-            if balance >= params.trade_amount:
-                threshold_price = last_buy_price * (1 - params.threshold_percent)
-                if price <= threshold_price:
-                    print(f"  BUY SIGNAL at {current_date.strftime('%Y-%m-%d %H:%M')}:")
-                    print(f"    Current price: ${price:.2f}")
-                    print(f"    Threshold price: ${threshold_price:.2f}")
-                    print(f"    Last buy price: ${last_buy_price:.2f}")
-                    print(f"    Price drop: {((last_buy_price - price) / last_buy_price * 100):.2f}%")
-                    
-                    trade_record = self._execute_buy_order(
-                        params, price, timestamp, order_counter, balance, eth_balance
-                    )
-                    trades.append(trade_record)
-                    
-                    sell_task = self._create_sell_task(
-                        order_counter, price, params.threshold_percent, 
-                        trade_record.eth_amount, params.trade_amount, timestamp
-                    )
-                    pending_sells.append(sell_task)
-                    
-                    commission = params.trade_amount * params.commission_rate
-                    eth_amount = (params.trade_amount - commission) / price
-                    balance -= params.trade_amount
-                    eth_balance += eth_amount
-                    last_buy_price = price
-                    order_counter += 1
-                    
-                    print(f"    BUY executed: {eth_amount:.6f} ETH for ${params.trade_amount}")
-                    print(f"    New balance: ${balance:.2f}, ETH: {eth_balance:.6f}")
-                else:
-                    if i % 1000 == 0:  # Log every 1000th check to avoid spam
-                        print(f"    Price check at {current_date.strftime('%Y-%m-%d %H:%M')}: ${price:.2f} > ${threshold_price:.2f} (no buy)")
-
-            if pending_sells:
-                for task in list(pending_sells):
-                    buy_price = task["buy_price"]
-                    target_price = task["target_price"]
+            for phase in get_bar_phases(ohlc, float(row["open"]), price):
+                if phase == TRAIL:
+                    last_buy_price = get_trailed_level(bool(pending_sells), bar_high, last_buy_price)
 
-                    if price >= target_price:
-                        print(f"  SELL SIGNAL at {current_date.strftime('%Y-%m-%d %H:%M')}:")
-                        print(f"    Current price: ${price:.2f}")
-                        print(f"    Target price: ${target_price:.2f}")
-                        print(f"    Buy price was: ${buy_price:.2f}")
-                        print(f"    Price rise: {((price - buy_price) / buy_price * 100):.2f}%")
+                elif phase == BUY:
+                    while balance >= params.trade_amount:
+                        threshold_price = last_buy_price * (1 - params.threshold_percent)
+                        if bar_low > threshold_price:
+                            if i % 1000 == 0:  # Log every 1000th check to avoid spam
+                                print(f"    Price check at {current_date.strftime('%Y-%m-%d %H:%M')}: ${bar_low:.2f} > ${threshold_price:.2f} (no buy)")
+                            break
                         
-                        trade_record = self._execute_sell_order(
-                            params, price, timestamp, order_counter, task, 
-                            balance, eth_balance
+                        fill_price = get_buy_fill_price(ohlc, price, bar_open, threshold_price)
+                        
+                        print(f"  BUY SIGNAL at {current_date.strftime('%Y-%m-%d %H:%M')}:")
+                        print(f"    Current price: ${fill_price:.2f}")
+                        print(f"    Threshold price: ${threshold_price:.2f}")
+                        print(f"    Last buy price: ${last_buy_price:.2f}")
+                        print(f"    Price drop: {((last_buy_price - fill_price) / last_buy_price * 100):.2f}%")
+                        
+                        trade_record = self._execute_buy_order(
+                            params, fill_price, timestamp, order_counter, balance, eth_balance
                         )
                         trades.append(trade_record)
+                        trade_timestamps.append(timestamp)
                         
-                        eth_to_sell = task["eth_amount"]
-                        gross_usdt = eth_to_sell * price
-                        commission = gross_usdt * params.commission_rate
-                        net_usdt = gross_usdt - commission
-                        
-                        invested = task["cost_usdt"]
-                        profit = net_usdt - invested
-                        total_profit += profit
-                        total_trades += 1
+                        sell_task = self._create_sell_task(
+                            order_counter, fill_price, params.threshold_percent, 
+                            trade_record.eth_amount, params.trade_amount, timestamp
+                        )
+                        pending_sells.append(sell_task)
                         
-                        balance += net_usdt
-                        eth_balance -= eth_to_sell
-                        last_buy_price = price
+                        commission = params.trade_amount * params.commission_rate
+                        eth_amount = (params.trade_amount - commission) / fill_price
+                        balance -= params.trade_amount
+                        eth_balance += eth_amount
+                        last_buy_price = fill_price
                         order_counter += 1
-                        pending_sells.remove(task)
                         
-                        print(f"    SELL executed: {eth_to_sell:.6f} ETH for ${net_usdt:.2f}")
-                        print(f"    Profit: ${profit:.2f}")
+                        print(f"    BUY executed: {eth_amount:.6f} ETH for ${params.trade_amount}")
                         print(f"    New balance: ${balance:.2f}, ETH: {eth_balance:.6f}")
+                        
+                        # Close-only fills allow a single buy per candle
+                        if not ohlc:
+                            break
 
-            if not pending_sells and price > last_buy_price:
-                last_buy_price = price
+                elif pending_sells:
+                    for task in list(pending_sells):
+                        buy_price = task["buy_price"]
+                        target_price = task["target_price"]
+
+                        if bar_high >= target_price:
+                            fill_price = get_sell_fill_price(
+                                ohlc, price, bar_open, target_price, task["buy_timestamp"] == timestamp
+                            )
+                            
+                            print(f"  SELL SIGNAL at {current_date.strftime('%Y-%m-%d %H:%M')}:")
+                            print(f"    Current price: ${fill_price:.2f}")
+                            print(f"    Target price: ${target_price:.2f}")
+                            print(f"    Buy price was: ${buy_price:.2f}")
+                            print(f"    Price rise: {((fill_price - buy_price) / buy_price * 100):.2f}%")
+                            
+                            trade_record = self._execute_sell_order(
+                                params, fill_price, timestamp, order_counter, task, 
+                                balance, eth_balance
+                            )
+                            trades.append(trade_record)
+                            trade_timestamps.append(timestamp)
+                            
+                            eth_to_sell = task["eth_amount"]
+                            gross_usdt = eth_to_sell * fill_price
+                            commission = gross_usdt * params.commission_rate
+                            net_usdt = gross_usdt - commission
+                            
+                            invested = task["cost_usdt"]
+                            profit = net_usdt - invested
+                            total_profit += profit
+                            total_trades += 1
+                            
+                            balance += net_usdt
+                            eth_balance -= eth_to_sell
+                            last_buy_price = fill_price
+                            order_counter += 1
+                            pending_sells.remove(task)
+                            
+                            print(f"    SELL executed: {eth_to_sell:.6f} ETH for ${net_usdt:.2f}")
+                            print(f"    Profit: ${profit:.2f}")
+                            print(f"    New balance: ${balance:.2f}, ETH: {eth_balance:.6f}")
+
+            last_buy_price = get_trailed_level(bool(pending_sells), bar_high, last_buy_price)
+            
+            # Candles between events cannot trade, so jump straight to the next one
+            next_index = self._get_next_event_index(
+                params, price_index, i + 1, balance, last_buy_price, pending_sells
+            )
+            if next_index is None and i + 1 < len(history_list) and balance < min_balance:
+                min_balance = balance
+            i = next_index
         
         print(f"\nStrategy execution completed:")
+        print(f"  Candles evaluated: {visited_candles} of {len(history_list)}")
         print(f"  Total trades: {len(trades)}")
         print(f"  Closed trades: {total_trades}")
         print(f"  Pending positions: {len(pending_sells)}")
@@ -161,10 +439,29 @@ class AsyncInvestmentAnalysisService:
         print(f"  Final ETH: {eth_balance:.6f}")
         
         summary = self._create_summary(params, balance, eth_balance, history_list, total_profit, total_trades, min_balance, pending_sells)
-        chart_data = self._create_chart_data(trades)
+        chart_data = self._create_chart_data(params, trades, trade_timestamps, history_list)
         
         return trades, summary, chart_data
     
+    def _get_next_event_index(self, params: InvestmentParams, price_index: PriceIndex, start: int,
+                              balance: float, last_buy_price: float,
+                              pending_sells: List[Dict[str, Any]]) -> Optional[int]:
+        candidates = []
+        
+        if balance >= params.trade_amount:
+            threshold_price = last_buy_price * (1 - params.threshold_percent)
+            candidates.append(price_index.next_low_at_or_below(start, threshold_price))
+        
+        if pending_sells:
+            target_price = min(task["target_price"] for task in pending_sells)
+            candidates.append(price_index.next_high_at_or_above(start, target_price))
+        else:
+            # With no open lots the buy level trails every new high
+            candidates.append(price_index.next_high_above(start, last_buy_price))
+        
+        found = [index for index in candidates if index is not None]
+        return min(found) if found else None
+    
     def _execute_buy_order(self, params: InvestmentParams, price: float, timestamp: int, 
                           order_counter: int, balance: float, eth_balance: float) -> TradeRecord:
         commission = params.trade_amount * params.commission_rate
@@ -240,10 +537,11 @@ class AsyncInvestmentAnalysisService:
             "pending_positions": len(pending_sells)
         }
     
-    def _create_chart_data(self, trades: List[TradeRecord]) -> Dict[str, Any]:
-        return {
-            "dates": [trade.date_time for trade in trades],
-            "prices": [trade.price for trade in trades],
-            "balances": [trade.balance_after for trade in trades],
-            "profits": [trade.profit if trade.profit else 0 for trade in trades]
-        }
+    def _create_chart_data(self, params: InvestmentParams, trades: List[TradeRecord], trade_timestamps: List[int],
+                           history_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # numpy is only needed once an analysis finishes, keep it off the startup path
+        from ..utils.chart_data import build_chart_data
+        
+        return build_chart_data(
+            history_list, trades, trade_timestamps, params.initial_balance, params.chart_points
+        )
@@ -0,0 +1,59 @@
+"""How the DCA strategy's orders fill inside one candle.
+
+Shared by the sync and async services and by strategy_engine.simulate_summary.
+robustness_engine.simulate_batch applies the same rules to whole columns of
+paths with numpy and is kept equal to these by tests/test_engine_equivalence.py.
+
+With close fills every level is checked against the candle close only. With
+OHLC fills buys trigger on the low and take-profits on the high; a bullish
+candle is assumed to trade open -> low -> high -> close and a bearish one
+open -> high -> low -> close.
+"""
+from typing import Tuple
+
+BUY = "BUY"
+SELL = "SELL"
+TRAIL = "TRAIL"
+
+BULLISH_PHASES = (BUY, SELL)
+# A bearish candle settles its sells and, with no lots left open, trails the
+# level up to its high before it can buy on the low
+BEARISH_PHASES = (SELL, TRAIL, BUY)
+
+
+def get_bar_prices(ohlc: bool, bar_open: float, bar_low: float, bar_high: float,
+                   close: float) -> Tuple[float, float, float]:
+    """The (open, low, high) the levels are checked against."""
+    if not ohlc:
+        return close, close, close
+    return bar_open, bar_low, bar_high
+
+
+def get_bar_phases(ohlc: bool, bar_open: float, close: float) -> Tuple[str, ...]:
+    if ohlc and close < bar_open:
+        return BEARISH_PHASES
+    return BULLISH_PHASES
+
+
+def get_trailed_level(has_open_lots: bool, bar_high: float, last_buy_price: float) -> float:
+    # With nothing to sell the buy level follows new highs
+    if not has_open_lots and bar_high > last_buy_price:
+        return bar_high
+    return last_buy_price
+
+
+def get_buy_fill_price(ohlc: bool, close: float, bar_open: float, threshold_price: float) -> float:
+    if not ohlc:
+        return close
+    # A candle that gaps below the level fills at its open
+    return min(bar_open, threshold_price)
+
+
+def get_sell_fill_price(ohlc: bool, close: float, bar_open: float, target_price: float,
+                        bought_this_candle: bool) -> float:
+    if not ohlc:
+        return close
+    # Lots bought earlier in this candle were filled after its open
+    if bought_this_candle:
+        return target_price
+    return max(bar_open, target_price)
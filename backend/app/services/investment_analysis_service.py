@@ -4,6 +4,9 @@ from fastapi import HTTPException
 
 from ..models.investment_models import InvestmentParams, TradeRecord, AnalysisResult
 from ..repositories.binance_repository import BinanceRepository
+from .fill_rules import (
+    BUY, TRAIL, get_bar_prices, get_bar_phases, get_trailed_level, get_buy_fill_price, get_sell_fill_price
+)
 
 
 class InvestmentAnalysisService:
@@ -47,64 +50,81 @@ class InvestmentAnalysisService:
         min_balance = balance
         total_profit = 0
         total_trades = 0
+        ohlc = params.fill_mode == "ohlc"
         
         for row in history_list:
             price = float(row["close"])
             timestamp = row["timestamp"]
+            bar_open, bar_low, bar_high = get_bar_prices(
+                ohlc, float(row["open"]), float(row["low"]), float(row["high"]), price
+            )
 
             if balance < min_balance:
                 min_balance = balance
 
-            if balance >= params.trade_amount:
-                if price <= last_buy_price * (1 - params.threshold_percent):
-                    trade_record = self._execute_buy_order(
-                        params, price, timestamp, order_counter, balance, eth_balance
-                    )
-                    trades.append(trade_record)
-                    
-                    sell_task = self._create_sell_task(
-                        order_counter, price, params.threshold_percent, 
-                        trade_record.eth_amount, params.trade_amount, timestamp
-                    )
-                    pending_sells.append(sell_task)
-                    
-                    commission = params.trade_amount * params.commission_rate
-                    eth_amount = (params.trade_amount - commission) / price
-                    balance -= params.trade_amount
-                    eth_balance += eth_amount
-                    last_buy_price = price
-                    order_counter += 1
-
-            if pending_sells:
-                for task in list(pending_sells):
-                    buy_price = task["buy_price"]
-                    target_price = task["target_price"]
+            for phase in get_bar_phases(ohlc, float(row["open"]), price):
+                if phase == TRAIL:
+                    last_buy_price = get_trailed_level(bool(pending_sells), bar_high, last_buy_price)
 
-                    if price >= target_price:
-                        trade_record = self._execute_sell_order(
-                            params, price, timestamp, order_counter, task, 
-                            balance, eth_balance
+                elif phase == BUY:
+                    while balance >= params.trade_amount:
+                        threshold_price = last_buy_price * (1 - params.threshold_percent)
+                        if bar_low > threshold_price:
+                            break
+                        
+                        fill_price = get_buy_fill_price(ohlc, price, bar_open, threshold_price)
+                        trade_record = self._execute_buy_order(
+                            params, fill_price, timestamp, order_counter, balance, eth_balance
                         )
                         trades.append(trade_record)
                         
-                        eth_to_sell = task["eth_amount"]
-                        gross_usdt = eth_to_sell * price
-                        commission = gross_usdt * params.commission_rate
-                        net_usdt = gross_usdt - commission
-                        
-                        invested = task["cost_usdt"]
-                        profit = net_usdt - invested
-                        total_profit += profit
-                        total_trades += 1
+                        sell_task = self._create_sell_task(
+                            order_counter, fill_price, params.threshold_percent, 
+                            trade_record.eth_amount, params.trade_amount, timestamp
+                        )
+                        pending_sells.append(sell_task)
                         
-                        balance += net_usdt
-                        eth_balance -= eth_to_sell
-                        last_buy_price = price
+                        commission = params.trade_amount * params.commission_rate
+                        eth_amount = (params.trade_amount - commission) / fill_price
+                        balance -= params.trade_amount
+                        eth_balance += eth_amount
+                        last_buy_price = fill_price
                         order_counter += 1
-                        pending_sells.remove(task)
+                        
+                        if not ohlc:
+                            break
+
+                elif pending_sells:
+                    for task in list(pending_sells):
+                        target_price = task["target_price"]
+
+                        if bar_high >= target_price:
+                            fill_price = get_sell_fill_price(
+                                ohlc, price, bar_open, target_price, task["buy_timestamp"] == timestamp
+                            )
+                            trade_record = self._execute_sell_order(
+                                params, fill_price, timestamp, order_counter, task, 
+                                balance, eth_balance
+                            )
+                            trades.append(trade_record)
+                            
+                            eth_to_sell = task["eth_amount"]
+                            gross_usdt = eth_to_sell * fill_price
+                            commission = gross_usdt * params.commission_rate
+                            net_usdt = gross_usdt - commission
+                            
+                            invested = task["cost_usdt"]
+                            profit = net_usdt - invested
+                            total_profit += profit
+                            total_trades += 1
+                            
+                            balance += net_usdt
+                            eth_balance -= eth_to_sell
+                            last_buy_price = fill_price
+                            order_counter += 1
+                            pending_sells.remove(task)
 
-            if not pending_sells and price > last_buy_price:
-                last_buy_price = price
+            last_buy_price = get_trailed_level(bool(pending_sells), bar_high, last_buy_price)
         
         summary = self._create_summary(params, balance, eth_balance, history_list, total_profit, total_trades, min_balance, pending_sells)
         chart_data = self._create_chart_data(trades)
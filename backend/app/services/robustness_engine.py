@@ -0,0 +1,259 @@
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from ..utils.process_pool import POOL_MAX_WORKERS, get_process_pool, reset_process_pool
+from .strategy_engine import PriceSeries, simulate_summary
+
+
+# Paths per batch are sized so each price matrix stays around 16 MB; the
+# split depends only on the series length, keeping results reproducible
+# for a given seed whatever the number of workers.
+BATCH_ELEMENTS = 2_000_000
+MAX_BATCH_PATHS = 250
+
+
+class BootstrapSource:
+    """Per-candle moves relative to the previous close, resampled in blocks
+    to build synthetic OHLC paths with the same local dynamics."""
+
+    def __init__(self, history_list: List[Dict[str, Any]]):
+        opens = np.array([row["open"] for row in history_list], dtype=float)
+        highs = np.array([row["high"] for row in history_list], dtype=float)
+        lows = np.array([row["low"] for row in history_list], dtype=float)
+        closes = np.array([row["close"] for row in history_list], dtype=float)
+
+        self.first_candle = (opens[0], highs[0], lows[0], closes[0])
+        previous_closes = closes[:-1]
+        self.close_ratios = closes[1:] / previous_closes
+        self.open_ratios = opens[1:] / previous_closes
+        self.high_ratios = highs[1:] / previous_closes
+        self.low_ratios = lows[1:] / previous_closes
+        self.candle_count = len(closes)
+
+    def sample_paths(self, path_count: int, block_size: int, rng: np.random.Generator) -> tuple:
+        move_count = self.candle_count - 1
+        first_open, first_high, first_low, first_close = self.first_candle
+        if move_count == 0:
+            column = np.ones((path_count, 1))
+            return column * first_open, column * first_high, column * first_low, column * first_close
+
+        block_size = min(block_size, move_count)
+        block_count = -(-move_count // block_size)
+        starts = rng.integers(0, move_count - block_size + 1, size=(path_count, block_count))
+        moves = (starts[:, :, None] + np.arange(block_size)).reshape(path_count, -1)[:, :move_count]
+
+        closes = np.empty((path_count, self.candle_count))
+        closes[:, 0] = first_close
+        closes[:, 1:] = first_close * np.cumprod(self.close_ratios[moves], axis=1)
+        previous_closes = closes[:, :-1]
+
+        opens = np.empty_like(closes)
+        highs = np.empty_like(closes)
+        lows = np.empty_like(closes)
+        opens[:, 0], highs[:, 0], lows[:, 0] = first_open, first_high, first_low
+        opens[:, 1:] = previous_closes * self.open_ratios[moves]
+        highs[:, 1:] = previous_closes * self.high_ratios[moves]
+        lows[:, 1:] = previous_closes * self.low_ratios[moves]
+        return opens, highs, lows, closes
+
+
+class _LotBook:
+    """Open lots of every path as growable (paths x slots) matrices."""
+
+    def __init__(self, path_count: int, capacity: int = 8):
+        self.active = np.zeros((path_count, capacity), dtype=bool)
+        self.target_prices = np.full((path_count, capacity), np.inf)
+        self.eth_amounts = np.zeros((path_count, capacity))
+        self.buy_indices = np.full((path_count, capacity), -1)
+        self.sequences = np.full((path_count, capacity), -1)
+        self.next_sequence = 0
+        # Per-path summaries that let quiet candles skip the matrices
+        self.open_counts = np.zeros(path_count, dtype=int)
+        self.min_targets = np.full(path_count, np.inf)
+
+    def add(self, rows: np.ndarray, target_prices: np.ndarray, eth_amounts: np.ndarray, buy_index: int) -> None:
+        free = ~self.active[rows]
+        if not free.any(axis=1).all():
+            self._grow()
+            free = ~self.active[rows]
+        slots = np.argmax(free, axis=1)
+        self.active[rows, slots] = True
+        self.target_prices[rows, slots] = target_prices
+        self.eth_amounts[rows, slots] = eth_amounts
+        self.buy_indices[rows, slots] = buy_index
+        self.sequences[rows, slots] = self.next_sequence
+        self.next_sequence += 1
+        self.open_counts[rows] += 1
+        self.min_targets[rows] = np.minimum(self.min_targets[rows], target_prices)
+
+    def close(self, rows: np.ndarray, row_hits: np.ndarray) -> None:
+        self.active[rows] &= ~row_hits
+        self.target_prices[rows] = np.where(row_hits, np.inf, self.target_prices[rows])
+        self.open_counts[rows] -= row_hits.sum(axis=1)
+        self.min_targets[rows] = self.target_prices[rows].min(axis=1)
+
+    def _grow(self) -> None:
+        path_count, capacity = self.active.shape
+        self.active = np.hstack([self.active, np.zeros((path_count, capacity), dtype=bool)])
+        self.target_prices = np.hstack([self.target_prices, np.full((path_count, capacity), np.inf)])
+        self.eth_amounts = np.hstack([self.eth_amounts, np.zeros((path_count, capacity))])
+        self.buy_indices = np.hstack([self.buy_indices, np.full((path_count, capacity), -1)])
+        self.sequences = np.hstack([self.sequences, np.full((path_count, capacity), -1)])
+
+
+def simulate_batch(opens: np.ndarray, highs: np.ndarray, lows: np.ndarray, closes: np.ndarray,
+                   strategy: Dict[str, float], fill_mode: str = "close") -> Dict[str, np.ndarray]:
+    """Run the DCA strategy over every row of the (paths x candles) price
+    matrices at once.
+
+    All paths advance one candle per step; buys and sells are applied with
+    masks, following the rules of fill_rules in the same order and with the
+    same arithmetic as strategy_engine.simulate_summary, so each path gives
+    the same figures as a scalar run.
+    """
+    initial_balance = strategy["initial_balance"]
+    trade_amount = strategy["trade_amount"]
+    threshold_percent = strategy["threshold_percent"]
+    commission_rate = strategy["commission_rate"]
+    ohlc = fill_mode == "ohlc"
+    if not ohlc:
+        opens = highs = lows = closes
+
+    path_count, candle_count = closes.shape
+    balance = np.full(path_count, float(initial_balance))
+    eth_balance = np.zeros(path_count)
+    last_buy_price = closes[:, 0].copy()
+    min_balance = balance.copy()
+    total_profit = np.zeros(path_count)
+    total_trades = np.zeros(path_count, dtype=int)
+    lots = _LotBook(path_count)
+    buy_commission = trade_amount * commission_rate
+
+    def buy(i: int) -> None:
+        while True:
+            threshold_prices = last_buy_price * (1 - threshold_percent)
+            rows = np.nonzero((balance >= trade_amount) & (lows[:, i] <= threshold_prices))[0]
+            if not len(rows):
+                return
+            if ohlc:
+                fill_prices = np.minimum(opens[rows, i], threshold_prices[rows])
+            else:
+                fill_prices = closes[rows, i]
+            eth_amounts = (trade_amount - buy_commission) / fill_prices
+            lots.add(rows, fill_prices * (1 + threshold_percent), eth_amounts, i)
+            balance[rows] -= trade_amount
+            eth_balance[rows] += eth_amounts
+            last_buy_price[rows] = fill_prices
+            if not ohlc:
+                return
+
+    def trail(i: int, path_mask: Optional[np.ndarray] = None) -> None:
+        trailing = (lots.open_counts == 0) & (highs[:, i] > last_buy_price)
+        if path_mask is not None:
+            trailing &= path_mask
+        last_buy_price[trailing] = highs[trailing, i]
+
+    def sell(i: int, path_mask: Optional[np.ndarray] = None) -> None:
+        reached = highs[:, i] >= lots.min_targets
+        if path_mask is not None:
+            reached &= path_mask
+        rows = np.nonzero(reached)[0]
+        if not len(rows):
+            return
+
+        row_hits = lots.active[rows] & (highs[rows, i, None] >= lots.target_prices[rows])
+        if ohlc:
+            fill_prices = np.where(
+                lots.buy_indices[rows] == i,
+                lots.target_prices[rows],
+                np.maximum(opens[rows, i, None], lots.target_prices[rows])
+            )
+        else:
+            fill_prices = np.broadcast_to(closes[rows, i, None], row_hits.shape)
+
+        # Settle each path's lots in the order they were bought
+        order = np.argsort(np.where(row_hits, lots.sequences[rows], np.iinfo(np.int64).max), axis=1)
+        for rank in range(int(row_hits.sum(axis=1).max())):
+            slots = order[:, rank]
+            settled = row_hits[np.arange(len(rows)), slots]
+            settled_rows, settled_slots = rows[settled], slots[settled]
+            fill_price = fill_prices[settled, settled_slots]
+            eth_amounts = lots.eth_amounts[settled_rows, settled_slots]
+            gross_usdt = eth_amounts * fill_price
+            net_usdt = gross_usdt - gross_usdt * commission_rate
+            total_profit[settled_rows] += net_usdt - trade_amount
+            total_trades[settled_rows] += 1
+            balance[settled_rows] += net_usdt
+            eth_balance[settled_rows] -= eth_amounts
+            last_buy_price[settled_rows] = fill_price
+
+        lots.close(rows, row_hits)
+
+    for i in range(candle_count):
+        np.minimum(min_balance, balance, out=min_balance)
+
+        if ohlc:
+            bearish = closes[:, i] < opens[:, i]
+            sell(i, bearish)
+            trail(i, bearish)
+            buy(i)
+            sell(i, ~bearish)
+        else:
+            buy(i)
+            sell(i)
+
+        trail(i)
+
+    final_prices = closes[:, -1]
+    final_balance = balance + eth_balance * final_prices
+    return {
+        "final_balance": final_balance,
+        "total_profit": total_profit,
+        "total_trades": total_trades,
+        "min_balance": min_balance,
+        "roi_percent": (final_balance - initial_balance) / initial_balance * 100,
+        "pending_positions": lots.open_counts.copy(),
+        "pending_exposure": np.where(lots.active, lots.eth_amounts, 0.0).sum(axis=1) * final_prices
+    }
+
+
+def _simulate_bootstrap_batch(source: BootstrapSource, strategy: Dict[str, float], fill_mode: str,
+                              path_count: int, block_size: int, seed: np.random.SeedSequence) -> Dict[str, np.ndarray]:
+    paths = source.sample_paths(path_count, block_size, np.random.default_rng(seed))
+    return simulate_batch(*paths, strategy, fill_mode)
+
+
+def simulate_bootstrap(history_list: List[Dict[str, Any]], strategy: Dict[str, float], fill_mode: str,
+                       path_count: int, block_size: int, seed: int,
+                       max_workers: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """Simulate ``path_count`` block-bootstrapped paths, batch by batch,
+    on the shared process pool when more than one batch is needed."""
+    source = BootstrapSource(history_list)
+    batch_paths = max(1, min(MAX_BATCH_PATHS, BATCH_ELEMENTS // source.candle_count))
+    batch_sizes = [min(batch_paths, path_count - offset) for offset in range(0, path_count, batch_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batch_sizes))
+    jobs = [(source, strategy, fill_mode, size, block_size, batch_seed) for size, batch_seed in zip(batch_sizes, seeds)]
+
+    workers = min(max_workers or POOL_MAX_WORKERS, len(jobs))
+    if workers == 1:
+        results = [_simulate_bootstrap_batch(*job) for job in jobs]
+    else:
+        try:
+            futures = [get_process_pool().submit(_simulate_bootstrap_batch, *job) for job in jobs]
+            results = [future.result() for future in futures]
+        except BrokenProcessPool:
+            reset_process_pool()
+            raise
+
+    return {key: np.concatenate([result[key] for result in results]) for key in results[0]}
+
+
+def simulate_robustness(history_list: List[Dict[str, Any]], strategy: Dict[str, float], fill_mode: str,
+                        path_count: int, block_size: int, seed: int) -> tuple:
+    """Bootstrapped outcomes plus the historical path's own summary, in one
+    call so that callers can run all of it off the event loop."""
+    outcomes = simulate_bootstrap(history_list, strategy, fill_mode, path_count, block_size, seed)
+    historical = simulate_summary(PriceSeries.from_history(history_list, fill_mode), strategy)
+    return outcomes, historical
@@ -0,0 +1,169 @@
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Optional
+
+from ..utils.price_index import PriceIndex
+from ..utils.process_pool import POOL_MAX_WORKERS, get_process_pool, reset_process_pool
+from .fill_rules import (
+    BUY, TRAIL, get_bar_prices, get_bar_phases, get_trailed_level, get_buy_fill_price, get_sell_fill_price
+)
+
+
+class PriceSeries:
+    """Candle columns plus the event index, shared by every window or path
+    simulated over the same candles."""
+
+    def __init__(self, opens: List[float], highs: List[float], lows: List[float], closes: List[float],
+                 fill_mode: str = "close"):
+        self.opens = opens
+        self.highs = highs
+        self.lows = lows
+        self.closes = closes
+        self.fill_mode = fill_mode
+        if fill_mode == "ohlc":
+            self.price_index = PriceIndex(lows, highs)
+        else:
+            self.price_index = PriceIndex(closes, closes)
+
+    @classmethod
+    def from_history(cls, history_list: List[Dict[str, Any]], fill_mode: str = "close") -> "PriceSeries":
+        return cls(
+            [row["open"] for row in history_list],
+            [row["high"] for row in history_list],
+            [row["low"] for row in history_list],
+            [row["close"] for row in history_list],
+            fill_mode
+        )
+
+    def __len__(self) -> int:
+        return len(self.closes)
+
+
+def simulate_summary(series: PriceSeries, strategy: Dict[str, float], start: int = 0,
+                     end: Optional[int] = None) -> Dict[str, float]:
+    """Run the DCA strategy over candles ``start..end-1`` and return only the
+    summary figures.
+
+    Mirrors AsyncInvestmentAnalysisService._execute_strategy_analysis without
+    building trade records or logging, so it is cheap enough to run for
+    thousands of windows or resampled paths.
+    """
+    if end is None:
+        end = len(series)
+
+    initial_balance = strategy["initial_balance"]
+    trade_amount = strategy["trade_amount"]
+    threshold_percent = strategy["threshold_percent"]
+    commission_rate = strategy["commission_rate"]
+    ohlc = series.fill_mode == "ohlc"
+    opens, highs, lows, closes = series.opens, series.highs, series.lows, series.closes
+    price_index = series.price_index
+
+    balance = initial_balance
+    eth_balance = 0.0
+    # Open lots as (buy_price, target_price, eth_amount, cost_usdt, buy_index)
+    pending_sells = []
+    last_buy_price = closes[start]
+    min_balance = balance
+    total_profit = 0.0
+    total_trades = 0
+
+    i = start
+    while i is not None:
+        price = closes[i]
+        bar_open, bar_low, bar_high = get_bar_prices(ohlc, opens[i], lows[i], highs[i], price)
+
+        if balance < min_balance:
+            min_balance = balance
+
+        for phase in get_bar_phases(ohlc, bar_open, price):
+            if phase == TRAIL:
+                last_buy_price = get_trailed_level(bool(pending_sells), bar_high, last_buy_price)
+
+            elif phase == BUY:
+                while balance >= trade_amount:
+                    threshold_price = last_buy_price * (1 - threshold_percent)
+                    if bar_low > threshold_price:
+                        break
+                    fill_price = get_buy_fill_price(ohlc, price, bar_open, threshold_price)
+                    commission = trade_amount * commission_rate
+                    eth_amount = (trade_amount - commission) / fill_price
+                    pending_sells.append((fill_price, fill_price * (1 + threshold_percent), eth_amount, trade_amount, i))
+                    balance -= trade_amount
+                    eth_balance += eth_amount
+                    last_buy_price = fill_price
+                    if not ohlc:
+                        break
+
+            elif pending_sells:
+                for lot in list(pending_sells):
+                    _, target_price, eth_amount, cost_usdt, buy_index = lot
+                    if bar_high >= target_price:
+                        fill_price = get_sell_fill_price(ohlc, price, bar_open, target_price, buy_index == i)
+                        gross_usdt = eth_amount * fill_price
+                        net_usdt = gross_usdt - gross_usdt * commission_rate
+                        total_profit += net_usdt - cost_usdt
+                        total_trades += 1
+                        balance += net_usdt
+                        eth_balance -= eth_amount
+                        last_buy_price = fill_price
+                        pending_sells.remove(lot)
+
+        last_buy_price = get_trailed_level(bool(pending_sells), bar_high, last_buy_price)
+
+        candidates = []
+        if balance >= trade_amount:
+            candidates.append(price_index.next_low_at_or_below(i + 1, last_buy_price * (1 - threshold_percent)))
+        if pending_sells:
+            candidates.append(price_index.next_high_at_or_above(i + 1, min(lot[1] for lot in pending_sells)))
+        else:
+            candidates.append(price_index.next_high_above(i + 1, last_buy_price))
+        found = [index for index in candidates if index is not None and index < end]
+        next_index = min(found) if found else None
+
+        if next_index is None and i + 1 < end and balance < min_balance:
+            min_balance = balance
+        i = next_index
+
+    final_balance = balance + eth_balance * closes[end - 1]
+    return {
+        "final_balance": final_balance,
+        "total_profit": total_profit,
+        "total_trades": total_trades,
+        "min_balance": min_balance,
+        "roi_percent": (final_balance - initial_balance) / initial_balance * 100,
+        "pending_positions": len(pending_sells)
+    }
+
+
+# Below this many windows a process pool costs more than it saves
+PARALLEL_MIN_WINDOWS = 64
+
+
+def _simulate_window_batch(series: PriceSeries, strategy: Dict[str, float],
+                           bounds: List[tuple]) -> List[Dict[str, float]]:
+    return [simulate_summary(series, strategy, start, end) for start, end in bounds]
+
+
+def simulate_windows(series: PriceSeries, strategy: Dict[str, float], bounds: List[tuple],
+                     max_workers: Optional[int] = None) -> List[Dict[str, float]]:
+    """Summaries for every (start, end) candle range. Large sets are split
+    into one batch per worker of the shared process pool."""
+    workers = max_workers or POOL_MAX_WORKERS
+    if len(bounds) < PARALLEL_MIN_WINDOWS or workers == 1:
+        return _simulate_window_batch(series, strategy, bounds)
+
+    batch_size = -(-len(bounds) // workers)
+    batches = [bounds[offset:offset + batch_size] for offset in range(0, len(bounds), batch_size)]
+    try:
+        futures = [get_process_pool().submit(_simulate_window_batch, series, strategy, batch) for batch in batches]
+        return [summary for future in futures for summary in future.result()]
+    except BrokenProcessPool:
+        reset_process_pool()
+        raise
+
+
+def simulate_history_windows(history_list: List[Dict[str, Any]], fill_mode: str, strategy: Dict[str, float],
+                             bounds: List[tuple]) -> List[Dict[str, float]]:
+    """simulate_windows over candle rows. Building the series' index is
+    CPU-bound too, so it happens here, in the caller's executor thread."""
+    return simulate_windows(PriceSeries.from_history(history_list, fill_mode), strategy, bounds)
@@ -1,4 +1,30 @@
-from .http_client import create_session
-from .date_utils import convert_date_to_timestamp
+import importlib
 
-__all__ = ['create_session', 'convert_date_to_timestamp']
+# http_client pulls in requests and chart_data numpy; load them on demand
+_LAZY_IMPORTS = {
+    'create_session': '.http_client',
+    'convert_date_to_timestamp': '.date_utils',
+    'get_interval_ms': '.date_utils',
+    'PriceIndex': '.price_index',
+    'build_chart_data': '.chart_data',
+    'stage_timer': '.profiling',
+    'ServerTimingMiddleware': '.profiling',
+    'AdmissionController': '.admission',
+    'get_admission_controller': '.admission',
+    'get_process_pool': '.process_pool',
+}
+
+__all__ = [
+    'create_session', 'convert_date_to_timestamp', 'get_interval_ms', 'PriceIndex',
+    'build_chart_data', 'stage_timer', 'ServerTimingMiddleware',
+    'AdmissionController', 'get_admission_controller', 'get_process_pool',
+]
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
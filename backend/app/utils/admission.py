@@ -0,0 +1,162 @@
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import HTTPException
+
+
+class AdmissionController:
+    """Limits the candle work analyses may have in flight.
+
+    Costs are estimated before fetching. A client may not hold more than
+    ``client_budget`` at once, and all clients together not more than
+    ``global_budget``; a single request above either is refused outright. Requests that do not fit wait in a queue ordered by
+    cost, so cheap analyses overtake expensive ones, and are rejected with
+    429 once the queue is full or their wait times out.
+    """
+
+    def __init__(self, global_budget: int, client_budget: int, max_queue: int = 100,
+                 queue_timeout: float = 10.0):
+        self.global_budget = global_budget
+        self.client_budget = client_budget
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self.in_flight = 0
+        self.client_in_flight = defaultdict(int)
+        self.waiters = []
+        self.sequence = itertools.count()
+        # Candles per second, learned from finished requests
+        self.throughput = None
+
+    @asynccontextmanager
+    async def admit(self, client_id: str, cost: int):
+        max_cost = min(self.global_budget, self.client_budget)
+        if cost > max_cost:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Request covers ~{cost} candles, more than the {max_cost} allowed. "
+                       f"Shorten the period, use a coarser interval or simulate fewer paths."
+            )
+
+        if self.client_in_flight[client_id] + cost > self.client_budget:
+            raise self._overloaded(f"Too much work in flight for client {client_id}")
+
+        self.client_in_flight[client_id] += cost
+        try:
+            await self._acquire(cost)
+        except BaseException:
+            self._release_client(client_id, cost)
+            raise
+
+        started = time.perf_counter()
+        completed = False
+        try:
+            yield
+            completed = True
+        finally:
+            # Failed requests often stop early and would overstate throughput
+            if completed:
+                self._record_throughput(cost, time.perf_counter() - started)
+            self.in_flight -= cost
+            self._release_client(client_id, cost)
+            self._wake_waiters()
+
+    async def _acquire(self, cost: int) -> None:
+        if not self.waiters and self._fits(cost):
+            self.in_flight += cost
+            return
+        if len(self.waiters) >= self.max_queue:
+            raise self._overloaded("Analysis queue is full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (cost, next(self.sequence), waiter))
+        self._wake_waiters()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                return
+            waiter.cancel()
+            raise self._overloaded("Timed out waiting for analysis capacity")
+        except BaseException:
+            # Admitted just as the caller went away: hand the capacity back
+            if waiter.done() and not waiter.cancelled():
+                self.in_flight -= cost
+                self._wake_waiters()
+            else:
+                waiter.cancel()
+            raise
+
+    def _fits(self, cost: int) -> bool:
+        return self.in_flight == 0 or self.in_flight + cost <= self.global_budget
+
+    def _wake_waiters(self) -> None:
+        while self.waiters:
+            cost, _, waiter = self.waiters[0]
+            if waiter.done():
+                heapq.heappop(self.waiters)
+                continue
+            if not self._fits(cost):
+                break
+            heapq.heappop(self.waiters)
+            self.in_flight += cost
+            waiter.set_result(None)
+
+    def _release_client(self, client_id: str, cost: int) -> None:
+        self.client_in_flight[client_id] -= cost
+        if self.client_in_flight[client_id] <= 0:
+            del self.client_in_flight[client_id]
+
+    def _record_throughput(self, cost: int, duration: float) -> None:
+        if duration <= 0:
+            return
+        rate = cost / duration
+        self.throughput = rate if self.throughput is None else 0.8 * self.throughput + 0.2 * rate
+
+    def _overloaded(self, detail: str) -> HTTPException:
+        queued = sum(cost for cost, _, waiter in self.waiters if not waiter.done())
+        if self.throughput:
+            retry_after = math.ceil((self.in_flight + queued) / self.throughput)
+        else:
+            retry_after = math.ceil(self.queue_timeout)
+        retry_after = min(max(retry_after, 1), 120)
+        return HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(retry_after)})
+
+
+_admission_controller = None
+
+# Proxies in front of the app that append to X-Forwarded-For; 0 trusts none
+TRUSTED_PROXY_COUNT = int(os.environ.get("TRUSTED_PROXY_COUNT", 0))
+
+
+def get_admission_controller() -> AdmissionController:
+    global _admission_controller
+    if _admission_controller is None:
+        _admission_controller = AdmissionController(
+            global_budget=int(os.environ.get("ADMISSION_GLOBAL_BUDGET", 1_000_000)),
+            client_budget=int(os.environ.get("ADMISSION_CLIENT_BUDGET", 500_000)),
+            max_queue=int(os.environ.get("ADMISSION_MAX_QUEUE", 100)),
+            queue_timeout=float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", 10))
+        )
+    return _admission_controller
+
+
+def get_client_id(forwarded_for: Optional[str], client_host: Optional[str],
+                  trusted_proxies: Optional[int] = None) -> str:
+    # Each proxy appends the address it received the request from, so with N
+    # trusted proxies in front the client is the Nth entry from the right.
+    # Entries further left come from the client and can be forged.
+    if trusted_proxies is None:
+        trusted_proxies = TRUSTED_PROXY_COUNT
+    if trusted_proxies and forwarded_for:
+        addresses = [address.strip() for address in forwarded_for.split(",")]
+        if len(addresses) >= trusted_proxies:
+            return addresses[-trusted_proxies]
+    return client_host or "unknown"
@@ -0,0 +1,75 @@
+import numpy as np
+from datetime import datetime
+from typing import List, Dict, Any
+
+
+def lttb_indices(values: np.ndarray, max_points: int) -> np.ndarray:
+    """Pick ``max_points`` indices of an evenly spaced series with
+    Largest-Triangle-Three-Buckets, keeping its peaks and troughs."""
+    length = len(values)
+    if max_points >= length or max_points < 3:
+        return np.arange(length)
+
+    positions = np.arange(length, dtype=float)
+    edges = np.linspace(1, length - 1, max_points - 1).astype(int)
+    selected = np.empty(max_points, dtype=int)
+    selected[0] = 0
+    selected[-1] = length - 1
+
+    anchor = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else length
+        next_x = positions[end:next_end].mean()
+        next_y = values[end:next_end].mean()
+
+        areas = np.abs(
+            (positions[anchor] - next_x) * (values[start:end] - values[anchor])
+            - (positions[anchor] - positions[start:end]) * (next_y - values[anchor])
+        )
+        anchor = start + int(np.argmax(areas))
+        selected[bucket + 1] = anchor
+
+    return selected
+
+
+def build_chart_data(history_list: List[Dict[str, Any]], trades: List[Any], trade_timestamps: List[int],
+                     initial_balance: float, max_points: int) -> Dict[str, Any]:
+    candle_count = len(history_list)
+    timestamps = np.fromiter((row["timestamp"] for row in history_list), dtype=np.int64, count=candle_count)
+    closes = np.fromiter((row["close"] for row in history_list), dtype=float, count=candle_count)
+
+    # State after the last trade at or before each candle
+    if trades:
+        trade_positions = np.searchsorted(np.asarray(trade_timestamps, dtype=np.int64), timestamps, side="right") - 1
+        traded = trade_positions >= 0
+        trade_positions = np.maximum(trade_positions, 0)
+
+        balances_after = np.array([trade.balance_after for trade in trades])
+        eth_balances_after = np.array([trade.eth_balance_after for trade in trades])
+        realized_profits = np.cumsum([trade.profit or 0 for trade in trades])
+
+        balances = np.where(traded, balances_after[trade_positions], initial_balance)
+        eth_balances = np.where(traded, eth_balances_after[trade_positions], 0.0)
+        profits = np.where(traded, realized_profits[trade_positions], 0.0)
+    else:
+        balances = np.full(candle_count, float(initial_balance))
+        eth_balances = np.zeros(candle_count)
+        profits = np.zeros(candle_count)
+
+    equity = balances + eth_balances * closes
+
+    # Split the budget between the two series that shape the chart
+    price_points = max_points // 2
+    indices = np.union1d(lttb_indices(closes, price_points), lttb_indices(equity, max_points - price_points))
+
+    return {
+        "dates": [
+            datetime.fromtimestamp(timestamp / 1000).strftime("%Y-%m-%d %H:%M:%S")
+            for timestamp in timestamps[indices].tolist()
+        ],
+        "prices": closes[indices].tolist(),
+        "balances": balances[indices].tolist(),
+        "equity": equity[indices].tolist(),
+        "profits": profits[indices].tolist()
+    }
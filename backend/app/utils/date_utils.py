@@ -11,3 +11,15 @@ def convert_date_to_timestamp(date_str: str) -> int:
             status_code=400, 
             detail="Invalid date format. Use ISO format (YYYY-MM-DDTHH:MM:SS)"
         )
+
+
+def get_interval_ms(interval: str) -> int:
+    interval_map = {
+        "1m": 60 * 1000,
+        "5m": 5 * 60 * 1000,
+        "15m": 15 * 60 * 1000,
+        "1h": 60 * 60 * 1000,
+        "4h": 4 * 60 * 60 * 1000,
+        "1d": 24 * 60 * 60 * 1000
+    }
+    return interval_map.get(interval, 60 * 1000)
@@ -0,0 +1,43 @@
+import hashlib
+import json
+from typing import Any, Optional
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+
+def make_digest(*parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def make_etag(*parts: Any) -> str:
+    # Weak validator: the body may be re-encoded by the gzip middleware
+    return f'W/"{make_digest(*parts)}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    opaque_tag = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        if candidate.strip().removeprefix("W/") == opaque_tag:
+            return True
+    return False
+
+
+def not_modified_response(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def cached_json_response(request: Request, content: Any, cache_control: str,
+                         etag: Optional[str] = None) -> Response:
+    if etag is None:
+        etag = make_etag(content)
+    if etag_matches(request, etag):
+        return not_modified_response(etag, cache_control)
+    return JSONResponse(content=content, headers={"ETag": etag, "Cache-Control": cache_control})
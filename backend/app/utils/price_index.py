@@ -0,0 +1,63 @@
+from array import array
+from typing import List, Dict, Any, Optional
+
+
+class PriceIndex:
+    """Segment trees over candle lows and highs.
+
+    Answers "first candle at or after ``start`` whose low/high crosses a
+    price" in O(log n), so the strategy can jump between trade events
+    instead of scanning every quiet candle.
+    """
+
+    def __init__(self, lows: List[float], highs: List[float]):
+        self.length = len(lows)
+        self.size = 1
+        while self.size < max(self.length, 1):
+            self.size *= 2
+
+        self.min_lows = array("d", [float("inf")]) * (2 * self.size)
+        self.max_highs = array("d", [float("-inf")]) * (2 * self.size)
+        self.min_lows[self.size:self.size + self.length] = array("d", lows)
+        self.max_highs[self.size:self.size + self.length] = array("d", highs)
+
+        for node in range(self.size - 1, 0, -1):
+            self.min_lows[node] = min(self.min_lows[2 * node], self.min_lows[2 * node + 1])
+            self.max_highs[node] = max(self.max_highs[2 * node], self.max_highs[2 * node + 1])
+
+    @classmethod
+    def from_history(cls, history_list: List[Dict[str, Any]], fill_mode: str = "close") -> "PriceIndex":
+        if fill_mode == "ohlc":
+            return cls([row["low"] for row in history_list], [row["high"] for row in history_list])
+        closes = [row["close"] for row in history_list]
+        return cls(closes, closes)
+
+    def next_low_at_or_below(self, start: int, price: float) -> Optional[int]:
+        return self._find_first(self.min_lows, start, lambda low: low <= price)
+
+    def next_high_at_or_above(self, start: int, price: float) -> Optional[int]:
+        return self._find_first(self.max_highs, start, lambda high: high >= price)
+
+    def next_high_above(self, start: int, price: float) -> Optional[int]:
+        return self._find_first(self.max_highs, start, lambda high: high > price)
+
+    def _find_first(self, tree: array, start: int, matches) -> Optional[int]:
+        if start >= self.length:
+            return None
+
+        # Climb right until a subtree contains a match...
+        node = start + self.size
+        while not matches(tree[node]):
+            while node & 1:
+                node >>= 1
+            if node == 0:
+                return None
+            node += 1
+
+        # ...then descend to its leftmost matching leaf
+        while node < self.size:
+            node *= 2
+            if not matches(tree[node]):
+                node += 1
+
+        return node - self.size
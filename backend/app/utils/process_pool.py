@@ -0,0 +1,39 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Engines submit from executor threads of a running server, where forking
+# the whole process is unsafe, so workers come from a fresh interpreter
+_DEFAULT_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+POOL_START_METHOD = os.environ.get("PROCESS_POOL_START_METHOD", _DEFAULT_START_METHOD)
+POOL_MAX_WORKERS = int(os.environ.get("PROCESS_POOL_WORKERS", os.cpu_count() or 1))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Worker processes shared by every CPU-bound engine, started on first use.
+
+    Requests never create pools of their own, so the process count stays at
+    POOL_MAX_WORKERS however many analyses run at once.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=POOL_MAX_WORKERS,
+                mp_context=multiprocessing.get_context(POOL_START_METHOD)
+            )
+        return _pool
+
+
+def reset_process_pool() -> None:
+    # A worker that died leaves the pool broken; the next caller gets a new one
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
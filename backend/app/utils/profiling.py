@@ -0,0 +1,226 @@
+import asyncio
+import cProfile
+import os
+import pstats
+import re
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from starlette.datastructures import MutableHeaders
+
+# Per-request profiles are opt-in per request (X-Profile: 1 header or
+# ?profile=1) and only honoured when the deployment enables them.
+PROFILING_ENABLED = os.environ.get("ENABLE_PROFILING", "").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "analysis_profiles"))
+# Only the most recent profiles are kept on disk
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", 20))
+# cProfile records everything on the event loop thread, other requests'
+# coroutines included. With PROFILE_EXCLUSIVE a profiled request waits for
+# the requests in flight and holds new ones back until it is done.
+PROFILE_EXCLUSIVE = os.environ.get("PROFILE_EXCLUSIVE", "").lower() in ("1", "true", "yes")
+
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+# Profiles recorded in executor threads for the request being profiled
+_thread_profiles: ContextVar[Optional[List[cProfile.Profile]]] = ContextVar("thread_profiles", default=None)
+_profiler_busy = False
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Add the wall time of the block to the current request's Server-Timing
+    entry for ``stage``. Concurrent blocks of the same stage accumulate."""
+    timings = _request_timings.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + (time.perf_counter() - started) * 1000
+
+
+def profiled(func: Callable) -> Callable:
+    """Wrap ``func`` before handing it to run_in_executor so that, when the
+    current request is being profiled, the work done in the executor thread
+    is recorded too. Work in other processes is not seen."""
+    thread_profiles = _thread_profiles.get()
+    if thread_profiles is None:
+        return func
+
+    def run_profiled(*args):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return func(*args)
+        finally:
+            profiler.disable()
+            thread_profiles.append(profiler)
+    return run_profiled
+
+
+def get_profile_path(profile_id: str) -> Optional[str]:
+    if not re.fullmatch(r"[0-9a-f]{32}", profile_id):
+        return None
+    return os.path.join(PROFILE_DIR, f"{profile_id}.prof")
+
+
+def _profile_requested(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"x-profile" and value.lower() in (b"1", b"true"):
+            return True
+    query = parse_qs(scope.get("query_string", b"").decode())
+    return query.get("profile", [""])[0].lower() in ("1", "true")
+
+
+class _RequestGate:
+    """Shared/exclusive gate over requests. Waiting exclusive requests stop
+    new shared ones from entering, so a profiled request is not starved."""
+
+    def __init__(self):
+        self.active = 0
+        self.exclusive = False
+        self.exclusive_waiting = 0
+        self.changed = None
+
+    @asynccontextmanager
+    async def shared(self):
+        await self._wait_until(lambda: not self.exclusive and not self.exclusive_waiting)
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._notify()
+
+    @asynccontextmanager
+    async def exclusive_access(self):
+        self.exclusive_waiting += 1
+        try:
+            await self._wait_until(lambda: not self.exclusive and not self.active)
+        finally:
+            self.exclusive_waiting -= 1
+            self._notify()
+        self.exclusive = True
+        try:
+            yield
+        finally:
+            self.exclusive = False
+            self._notify()
+
+    async def _wait_until(self, predicate: Callable[[], bool]) -> None:
+        while not predicate():
+            if self.changed is None:
+                self.changed = asyncio.Event()
+            await self.changed.wait()
+
+    def _notify(self) -> None:
+        # Wake every waiter to re-check; later waits use a fresh event
+        if self.changed is not None:
+            self.changed.set()
+            self.changed = None
+
+
+_request_gate = _RequestGate()
+
+
+class ServerTimingMiddleware:
+    """Adds a Server-Timing header to every HTTP response and, when enabled,
+    records a cProfile of requests that ask for it."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if not (PROFILING_ENABLED and PROFILE_EXCLUSIVE):
+            await self._handle(scope, receive, send)
+        elif _profile_requested(scope):
+            async with _request_gate.exclusive_access():
+                await self._handle(scope, receive, send)
+        else:
+            async with _request_gate.shared():
+                await self._handle(scope, receive, send)
+
+    async def _handle(self, scope, receive, send):
+        timings = {}
+        token = _request_timings.set(timings)
+        profiler = self._start_profiler(scope)
+        profile_token = _thread_profiles.set([]) if profiler is not None else None
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            nonlocal profiler
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if profiler is not None:
+                    headers.append("X-Profile-Id", await self._stop_profiler(profiler))
+                    profiler = None
+                timings["total"] = (time.perf_counter() - started) * 1000
+                headers.append("Server-Timing", ", ".join(
+                    f"{stage};dur={duration:.1f}" for stage, duration in timings.items()
+                ))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if profiler is not None:
+                await self._stop_profiler(profiler)
+            if profile_token is not None:
+                _thread_profiles.reset(profile_token)
+            _request_timings.reset(token)
+
+    def _start_profiler(self, scope) -> Optional[cProfile.Profile]:
+        global _profiler_busy
+        # cProfile hooks the whole thread, so only one request is profiled at a time
+        if not PROFILING_ENABLED or _profiler_busy or not _profile_requested(scope):
+            return None
+        _profiler_busy = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    async def _stop_profiler(self, profiler: cProfile.Profile) -> str:
+        global _profiler_busy
+        profiler.disable()
+        thread_profiles = list(_thread_profiles.get() or [])
+
+        profile_id = uuid.uuid4().hex
+        try:
+            # Building and writing the stats is slow; keep it off the event loop
+            await asyncio.to_thread(self._store_profile, profile_id, profiler, thread_profiles)
+        finally:
+            _profiler_busy = False
+        print(f"Stored request profile {profile_id}")
+        return profile_id
+
+    def _store_profile(self, profile_id: str, profiler: cProfile.Profile,
+                       thread_profiles: List[cProfile.Profile]) -> None:
+        stats = pstats.Stats(profiler)
+        for thread_profile in thread_profiles:
+            stats.add(thread_profile)
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stats.dump_stats(get_profile_path(profile_id))
+        self._prune_profiles()
+
+    def _prune_profiles(self) -> None:
+        profiles = []
+        for name in os.listdir(PROFILE_DIR):
+            if name.endswith(".prof"):
+                path = os.path.join(PROFILE_DIR, name)
+                try:
+                    profiles.append((os.path.getmtime(path), path))
+                except FileNotFoundError:
+                    continue
+        for _, path in sorted(profiles, reverse=True)[PROFILE_KEEP:]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
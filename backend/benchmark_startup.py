@@ -0,0 +1,100 @@
+"""Startup benchmark: import-time report and cold start to the first /health.
+
+Usage:
+    python benchmark_startup.py [--runs 5] [--top 15] [--budget-ms 2000]
+
+Exits with status 1 when the median cold start exceeds the budget, so it can
+run as a CI gate. The budget defaults to $STARTUP_BUDGET_MS or 2000 ms.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that should stay off the API startup path
+DEFERRED_MODULES = ["requests", "urllib3", "numpy"]
+
+
+def import_time_report(top: int) -> None:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True, text=True, cwd=BACKEND_DIR
+    )
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+
+    total_us = next((cumulative for _, cumulative, name in rows if name == "app.main"), 0)
+    print(f"Import of app.main: {total_us / 1000:.1f} ms")
+    print(f"Top {top} modules by self time:")
+    for self_us, cumulative_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"  {self_us / 1000:8.1f} ms  (cumulative {cumulative_us / 1000:8.1f} ms)  {name}")
+
+    loaded = subprocess.run(
+        [sys.executable, "-c",
+         f"import sys, app.main; print(' '.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"],
+        capture_output=True, text=True, cwd=BACKEND_DIR
+    ).stdout.split()
+    print(f"Deferred modules loaded at startup: {', '.join(loaded) if loaded else 'none'}")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_cold_start(timeout: float = 30.0) -> float:
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"/health did not answer within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("STARTUP_BUDGET_MS", 2000)))
+    args = parser.parse_args()
+
+    import_time_report(args.top)
+
+    timings = [measure_cold_start() for _ in range(args.runs)]
+    median_ms = statistics.median(timings)
+    print(f"Cold start to first /health over {args.runs} runs: "
+          f"min {min(timings):.0f} ms, median {median_ms:.0f} ms, max {max(timings):.0f} ms")
+
+    if median_ms > args.budget_ms:
+        print(f"FAIL: median cold start exceeds the {args.budget_ms:.0f} ms budget")
+        return 1
+    print(f"OK: within the {args.budget_ms:.0f} ms budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils.admission import AdmissionController, get_client_id
+
+
+async def hold(controller: AdmissionController, client_id: str, cost: int, release: asyncio.Event,
+               admitted: list = None):
+    async with controller.admit(client_id, cost):
+        if admitted is not None:
+            admitted.append(client_id)
+        await release.wait()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_request_above_client_budget_is_rejected_up_front():
+    async def scenario():
+        controller = AdmissionController(global_budget=100, client_budget=30)
+        with pytest.raises(HTTPException) as error:
+            async with controller.admit("a", 90):
+                pass
+        assert error.value.status_code == 400
+        assert controller.in_flight == 0 and not controller.client_in_flight
+
+    asyncio.run(scenario())
+
+
+def test_client_over_its_budget_gets_429():
+    async def scenario():
+        controller = AdmissionController(global_budget=100, client_budget=30)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, "a", 20, release))
+        await settle()
+
+        with pytest.raises(HTTPException) as error:
+            async with controller.admit("a", 20):
+                pass
+        assert error.value.status_code == 429
+        assert "Retry-After" in error.value.headers
+
+        # Other clients are unaffected
+        async with controller.admit("b", 20):
+            pass
+        release.set()
+        await holder
+        assert controller.in_flight == 0 and not controller.client_in_flight
+
+    asyncio.run(scenario())
+
+
+def test_queued_requests_are_admitted_cheapest_first():
+    async def scenario():
+        controller = AdmissionController(global_budget=100, client_budget=100)
+        release = asyncio.Event()
+        admitted = []
+        holder = asyncio.create_task(hold(controller, "big", 100, release))
+        await settle()
+
+        waiters = [
+            asyncio.create_task(hold(controller, client_id, cost, release, admitted))
+            for client_id, cost in (("c60", 60), ("c10", 10), ("c30", 30))
+        ]
+        await settle()
+        assert admitted == []
+
+        release.set()
+        await asyncio.gather(holder, *waiters)
+        assert admitted == ["c10", "c30", "c60"]
+        assert controller.in_flight == 0 and not controller.client_in_flight
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_and_queue_timeout_get_429_with_retry_after():
+    async def scenario():
+        controller = AdmissionController(global_budget=100, client_budget=100, max_queue=1, queue_timeout=0.1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, "a", 100, release))
+        await settle()
+
+        queued = asyncio.create_task(hold(controller, "b", 10, release))
+        await settle()
+        with pytest.raises(HTTPException) as full:
+            async with controller.admit("c", 10):
+                pass
+        assert full.value.status_code == 429 and full.value.detail == "Analysis queue is full"
+        assert int(full.value.headers["Retry-After"]) >= 1
+
+        with pytest.raises(HTTPException) as timed_out:
+            await queued
+        assert timed_out.value.status_code == 429
+        assert "Retry-After" in timed_out.value.headers
+
+        release.set()
+        await holder
+        assert controller.in_flight == 0 and not controller.client_in_flight
+
+    asyncio.run(scenario())
+
+
+def test_cancelling_a_queued_request_releases_its_place():
+    async def scenario():
+        controller = AdmissionController(global_budget=100, client_budget=100)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, "a", 100, release))
+        await settle()
+
+        queued = asyncio.create_task(hold(controller, "b", 50, release))
+        await settle()
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        assert not controller.client_in_flight.get("b")
+
+        release.set()
+        await holder
+        async with controller.admit("c", 100):
+            assert controller.in_flight == 100
+        assert controller.in_flight == 0 and not controller.client_in_flight
+
+    asyncio.run(scenario())
+
+
+def test_failed_requests_do_not_update_throughput():
+    async def scenario():
+        controller = AdmissionController(global_budget=1000, client_budget=1000)
+        with pytest.raises(HTTPException):
+            async with controller.admit("a", 1000):
+                raise HTTPException(status_code=400, detail="No data available")
+        assert controller.throughput is None
+
+        async with controller.admit("a", 1000):
+            await asyncio.sleep(0.01)
+        assert controller.throughput is not None
+
+    asyncio.run(scenario())
+
+
+def test_client_id_ignores_untrusted_forwarded_for():
+    assert get_client_id("6.6.6.6, 1.2.3.4", "10.0.0.1", trusted_proxies=0) == "10.0.0.1"
+    assert get_client_id("6.6.6.6, 1.2.3.4", "10.0.0.1", trusted_proxies=1) == "1.2.3.4"
+    assert get_client_id("1.2.3.4", "10.0.0.1", trusted_proxies=2) == "10.0.0.1"
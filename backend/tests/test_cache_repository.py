@@ -0,0 +1,202 @@
+import asyncio
+import os
+import time
+
+from app.repositories.cache_repository import RedisCache, DiskCache, encode_klines, decode_klines
+
+
+class RespStandIn:
+    """In-process server speaking enough RESP for GET, MGET and SET [PX].
+    A hung stand-in accepts connections but never answers."""
+
+    def __init__(self, slow_keys=(), delay: float = 0.3, hung: bool = False):
+        self.store = {}
+        self.slow_keys = set(slow_keys)
+        self.delay = delay
+        self.hung = hung
+        self.connections = 0
+        self.commands = 0
+        self.server = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"redis://127.0.0.1:{port}/0"
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                parts = []
+                for _ in range(int(line[1:-2])):
+                    length = int((await reader.readline())[1:-2])
+                    parts.append((await reader.readexactly(length + 2))[:-2])
+
+                self.commands += 1
+                if self.hung:
+                    continue
+                command, key = parts[0].upper(), parts[1]
+                if key in self.slow_keys:
+                    await asyncio.sleep(self.delay)
+                if command == b"GET":
+                    writer.write(self._bulk(self.store.get(key)))
+                elif command == b"MGET":
+                    writer.write(b"*%d\r\n" % (len(parts) - 1))
+                    for key in parts[1:]:
+                        writer.write(self._bulk(self.store.get(key)))
+                elif command == b"SET":
+                    self.store[key] = parts[2]
+                    writer.write(b"+OK\r\n")
+                else:
+                    writer.write(b"-ERR unknown command\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _bulk(self, value) -> bytes:
+        return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def run_with_server(scenario, **server_options):
+    async def main():
+        server = RespStandIn(**server_options)
+        url = await server.start()
+        try:
+            return await scenario(server, url)
+        finally:
+            await server.stop()
+    return asyncio.run(main())
+
+
+def test_redis_get_and_set():
+    async def scenario(server, url):
+        cache = RedisCache(url)
+        assert await cache.get("missing") is None
+        await cache.set("key", b"\x00binary\r\nvalue", ttl=60)
+        assert await cache.get("key") == b"\x00binary\r\nvalue"
+        assert server.connections == 1
+
+    run_with_server(scenario)
+
+
+def test_redis_cancelled_command_does_not_leak_its_reply():
+    async def scenario(server, url):
+        server.store[b"slow"] = b"slow value"
+        server.store[b"fast"] = b"fast value"
+        cache = RedisCache(url)
+
+        pending = asyncio.create_task(cache.get("slow"))
+        await asyncio.sleep(0.05)
+        pending.cancel()
+        try:
+            await pending
+        except asyncio.CancelledError:
+            pass
+
+        # Let the stale reply arrive before the next command is sent
+        await asyncio.sleep(0.4)
+        assert await cache.get("fast") == b"fast value"
+        assert server.connections == 2
+
+    run_with_server(scenario, slow_keys=[b"slow"])
+
+
+def test_redis_timeout_behaves_like_a_miss():
+    async def scenario(server, url):
+        server.store[b"slow"] = b"slow value"
+        server.store[b"fast"] = b"fast value"
+        cache = RedisCache(url, timeout=0.1)
+
+        assert await cache.get("slow") is None
+        # Redis is skipped until the backoff runs out
+        assert await cache.get("fast") is None
+        assert server.commands == 1
+
+    run_with_server(scenario, slow_keys=[b"slow"])
+
+
+def test_redis_get_many_and_set_many():
+    async def scenario(server, url):
+        cache = RedisCache(url)
+        keys = [f"chunk{index}" for index in range(250)]
+        await cache.set_many({key: key.encode() for key in keys[::2]}, ttl=60)
+        values = await cache.get_many(keys)
+
+        assert values == [key.encode() if index % 2 == 0 else None for index, key in enumerate(keys)]
+        # 125 pipelined SETs and three MGET batches
+        assert server.commands == 125 + 3
+        assert server.connections == 1
+
+    run_with_server(scenario)
+
+
+def test_redis_hung_server_is_skipped_after_one_timeout():
+    async def scenario(server, url):
+        cache = RedisCache(url, timeout=0.2, retry_after=60)
+
+        started = time.perf_counter()
+        values = await asyncio.gather(*[cache.get(f"key{index}") for index in range(20)])
+        assert values == [None] * 20
+        assert await cache.get_many([f"chunk{index}" for index in range(500)]) == [None] * 500
+        await cache.set("key", b"value")
+
+        assert time.perf_counter() - started < 0.6
+        assert server.commands == 1
+
+    run_with_server(scenario, hung=True)
+
+
+def test_redis_is_retried_after_the_backoff():
+    async def scenario(server, url):
+        server.store[b"key"] = b"value"
+        server.hung = True
+        cache = RedisCache(url, timeout=0.1, retry_after=0.2)
+        assert await cache.get("key") is None
+
+        server.hung = False
+        assert await cache.get("key") is None
+        await asyncio.sleep(0.25)
+        assert await cache.get("key") == b"value"
+
+    run_with_server(scenario)
+
+
+def test_disk_cache_expires_and_evicts(tmp_path):
+    async def scenario():
+        cache = DiskCache(str(tmp_path), max_bytes=1000)
+        await cache.set("expired", b"x", ttl=0.01)
+        await asyncio.sleep(0.05)
+        assert await cache.get("expired") is None
+
+        for index in range(3):
+            await cache.set(f"key{index}", bytes(300))
+            written_at = time.time() - 100 + index
+            os.utime(cache._get_path(f"key{index}"), (written_at, written_at))
+
+        # Reading key0 makes key1 the least recently used entry
+        assert await cache.get("key0") == bytes(300)
+        await cache.set("key3", bytes(300))
+
+        assert await cache.get("key1") is None
+        assert await cache.get("key0") == bytes(300)
+        assert await cache.get("key3") == bytes(300)
+        assert sum(os.path.getsize(path) for path in tmp_path.iterdir()) <= 1000
+
+    asyncio.run(scenario())
+
+
+def test_klines_round_trip():
+    klines = [{
+        "timestamp": 1700000000000, "open": 1.5, "high": 2.0, "low": 1.0,
+        "close": 1.75, "volume": 12.5, "close_time": 1700003599999
+    }]
+    assert decode_klines(encode_klines(klines)) == klines
@@ -0,0 +1,102 @@
+import asyncio
+import random
+
+import numpy as np
+import pytest
+
+from app.models.investment_models import InvestmentParams
+from app.services.async_investment_analysis_service import AsyncInvestmentAnalysisService
+from app.services.investment_analysis_service import InvestmentAnalysisService
+from app.services.robustness_engine import BootstrapSource, simulate_batch
+from app.services.strategy_engine import PriceSeries, simulate_summary
+
+SUMMARY_KEYS = ["final_balance", "total_profit", "total_trades", "min_balance", "roi_percent", "pending_positions"]
+
+# Threshold / trade amount pairs from sparse trading to many stacked lots
+STRATEGIES = [(0.005, 300.0), (0.02, 1000.0), (0.08, 2500.0)]
+
+
+def make_candles(count: int, seed: int, interval_ms: int = 60 * 60 * 1000) -> list:
+    rng = random.Random(seed)
+    price = 2000.0
+    candles = []
+    for index in range(count):
+        open_price = price
+        close = open_price * (1 + rng.gauss(0, 0.01))
+        high = max(open_price, close) * (1 + abs(rng.gauss(0, 0.005)))
+        low = min(open_price, close) * (1 - abs(rng.gauss(0, 0.005)))
+        timestamp = 1700000000000 + index * interval_ms
+        candles.append({
+            "timestamp": timestamp, "open": open_price, "high": high, "low": low,
+            "close": close, "volume": 1.0, "close_time": timestamp + interval_ms - 1
+        })
+        price = close
+    return candles
+
+
+def make_params(fill_mode: str, threshold_percent: float, trade_amount: float) -> InvestmentParams:
+    return InvestmentParams(
+        start_date="2023-11-14T00:00:00", end_date="2024-01-01T00:00:00",
+        fill_mode=fill_mode, threshold_percent=threshold_percent, trade_amount=trade_amount
+    )
+
+
+def get_strategy(params: InvestmentParams) -> dict:
+    return {
+        "initial_balance": params.initial_balance,
+        "trade_amount": params.trade_amount,
+        "threshold_percent": params.threshold_percent,
+        "commission_rate": params.commission_rate
+    }
+
+
+def linear_scan(params: InvestmentParams, candles: list) -> tuple:
+    """The sync service replays every candle and is the reference engine."""
+    trades, summary, _ = InvestmentAnalysisService(None)._execute_strategy_analysis(params, candles)
+    return trades, {key: summary[key] for key in SUMMARY_KEYS}
+
+
+@pytest.mark.parametrize("fill_mode", ["close", "ohlc"])
+@pytest.mark.parametrize("threshold_percent, trade_amount", STRATEGIES)
+def test_async_engine_matches_linear_scan(fill_mode, threshold_percent, trade_amount):
+    params = make_params(fill_mode, threshold_percent, trade_amount)
+    for seed in range(3):
+        candles = make_candles(1500, seed)
+        expected_trades, expected_summary = linear_scan(params, candles)
+
+        service = AsyncInvestmentAnalysisService()
+        trades, summary, _ = asyncio.run(service._execute_strategy_analysis(params, candles))
+
+        assert [trade.model_dump() for trade in trades] == [trade.model_dump() for trade in expected_trades]
+        assert {key: summary[key] for key in SUMMARY_KEYS} == expected_summary
+
+
+@pytest.mark.parametrize("fill_mode", ["close", "ohlc"])
+@pytest.mark.parametrize("threshold_percent, trade_amount", STRATEGIES)
+def test_simulate_summary_matches_linear_scan(fill_mode, threshold_percent, trade_amount):
+    params = make_params(fill_mode, threshold_percent, trade_amount)
+    candles = make_candles(1500, 7)
+    series = PriceSeries.from_history(candles, fill_mode)
+
+    for start, end in [(0, 1500), (0, 200), (350, 1100), (1499, 1500)]:
+        _, expected_summary = linear_scan(params, candles[start:end])
+        assert simulate_summary(series, get_strategy(params), start, end) == expected_summary
+
+
+@pytest.mark.parametrize("fill_mode", ["close", "ohlc"])
+@pytest.mark.parametrize("threshold_percent, trade_amount", STRATEGIES)
+def test_simulate_batch_matches_linear_scan(fill_mode, threshold_percent, trade_amount):
+    params = make_params(fill_mode, threshold_percent, trade_amount)
+    candles = make_candles(800, 11)
+    opens, highs, lows, closes = BootstrapSource(candles).sample_paths(12, 24, np.random.default_rng(3))
+
+    outcomes = simulate_batch(opens, highs, lows, closes, get_strategy(params), fill_mode)
+
+    for path in range(len(closes)):
+        path_candles = [
+            dict(candle, open=float(opens[path, index]), high=float(highs[path, index]),
+                 low=float(lows[path, index]), close=float(closes[path, index]))
+            for index, candle in enumerate(candles)
+        ]
+        _, expected_summary = linear_scan(params, path_candles)
+        assert {key: outcomes[key][path].item() for key in SUMMARY_KEYS} == expected_summary
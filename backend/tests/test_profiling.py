@@ -0,0 +1,79 @@
+import asyncio
+
+from app.utils.profiling import _RequestGate
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def hold(context, name: str, events: list, release: asyncio.Event):
+    async with context:
+        events.append(f"{name} in")
+        await release.wait()
+        events.append(f"{name} out")
+
+
+def test_exclusive_request_waits_for_in_flight_and_holds_new_ones():
+    async def scenario():
+        gate = _RequestGate()
+        events = []
+        release_a, release_p, release_b = asyncio.Event(), asyncio.Event(), asyncio.Event()
+        a = asyncio.create_task(hold(gate.shared(), "a", events, release_a))
+        await settle()
+        p = asyncio.create_task(hold(gate.exclusive_access(), "p", events, release_p))
+        await settle()
+        b = asyncio.create_task(hold(gate.shared(), "b", events, release_b))
+        await settle()
+        assert events == ["a in"]
+
+        release_a.set()
+        await settle()
+        assert events == ["a in", "a out", "p in"]
+
+        release_p.set()
+        await settle()
+        assert events[-2:] == ["p out", "b in"]
+        release_b.set()
+        await asyncio.gather(a, p, b)
+        assert gate.active == 0 and not gate.exclusive and not gate.exclusive_waiting
+
+    asyncio.run(scenario())
+
+
+def test_shared_requests_run_together():
+    async def scenario():
+        gate = _RequestGate()
+        events = []
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(hold(gate.shared(), name, events, release)) for name in "abc"]
+        await settle()
+        assert events == ["a in", "b in", "c in"]
+        release.set()
+        await asyncio.gather(*tasks)
+        assert gate.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_exclusive_waiter_unblocks_shared_requests():
+    async def scenario():
+        gate = _RequestGate()
+        events = []
+        release_a, release_b = asyncio.Event(), asyncio.Event()
+        a = asyncio.create_task(hold(gate.shared(), "a", events, release_a))
+        await settle()
+        p = asyncio.create_task(hold(gate.exclusive_access(), "p", events, asyncio.Event()))
+        await settle()
+        b = asyncio.create_task(hold(gate.shared(), "b", events, release_b))
+        await settle()
+        p.cancel()
+        await settle()
+        assert events == ["a in", "b in"]
+        release_a.set()
+        release_b.set()
+        await asyncio.gather(a, b)
+        assert gate.active == 0 and not gate.exclusive_waiting
+
+    asyncio.run(scenario())
@@ -13,7 +13,8 @@ function Charts({ chart_data }) {
                     <LineChart data={chart_data.dates.map((date, index) => ({
                         date: date.split(' ')[0],
                         price: chart_data.prices[index],
-                        balance: chart_data.balances[index]
+                        balance: chart_data.balances[index],
+                        equity: chart_data.equity[index]
                     }))}>
                         <CartesianGrid strokeDasharray="3 3" />
                         <XAxis dataKey="date" />
@@ -21,14 +22,15 @@ function Charts({ chart_data }) {
                         <YAxis yAxisId="right" orientation="right" />
                         <Tooltip />
                         <Legend />
-                        <Line yAxisId="left" type="monotone" dataKey="price" stroke="#8884d8" name="Price" />
-                        <Line yAxisId="right" type="monotone" dataKey="balance" stroke="#82ca9d" name="Balance" />
+                        <Line yAxisId="left" type="monotone" dataKey="price" stroke="#8884d8" name="Price" dot={false} />
+                        <Line yAxisId="right" type="monotone" dataKey="balance" stroke="#82ca9d" name="Balance" dot={false} />
+                        <Line yAxisId="right" type="monotone" dataKey="equity" stroke="#ffc658" name="Equity" dot={false} />
                     </LineChart>
                 </ResponsiveContainer>
             </div>
 
             <div className={styles.chartContainer}>
-                <h4>Profit by Trades</h4>
+                <h4>Realized Profit</h4>
                 <ResponsiveContainer width="100%" height={400}>
                     <BarChart data={chart_data.dates.map((date, index) => ({
                         date: date.split(' ')[0],